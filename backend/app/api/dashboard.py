@@ -1,14 +1,18 @@
 """
 仪表盘 API 路由
 """
+import asyncio
+import time
 from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
+from sqlalchemy import Float, cast, func, literal, null, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import SETTINGS
 from app.core.database import get_db
-from app.models import Task, TaskStatus, Linode, LinodeStatus as LinodeStatusEnum
+from app.models import Config, Task, TaskStatus, Linode, LinodeStatus as LinodeStatusEnum
 from app.schemas import (
     DashboardResponse,
     DashboardStats,
@@ -18,15 +22,114 @@ from app.schemas import (
     ProxyCheckResponse
 )
 from app.services import get_aria2_client, get_orchestrator, get_proxy_tester
+from app.services.cost_counter import current_monthly_cost_key
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# 仪表盘短时缓存 (前端轮询时避免每次都查询数据库和 Aria2)
+_dashboard_cache: Dict[str, Any] = {"t": 0.0, "v": None, "version": -1}
+_dashboard_version = 0
+_dashboard_lock = asyncio.Lock()
 
-@router.get("", response_model=DashboardResponse)
-async def get_dashboard(db: AsyncSession = Depends(get_db)):
-    """获取仪表盘数据"""
+# 任务状态 -> DashboardStats 字段 (UNION 结果列按首个成员取类型，状态以原始文本返回)
+_STATUS_TO_FIELD = {
+    TaskStatus.PENDING.value: "pending_count",
+    TaskStatus.CONFIRMED.value: "confirmed_count",
+    TaskStatus.DOWNLOADING.value: "downloading_count",
+    TaskStatus.COMPLETE.value: "completed_count",
+    TaskStatus.ERROR.value: "error_count",
+}
+
+
+def invalidate_dashboard_cache():
+    """使仪表盘缓存失效 (任务或实例状态变更后调用)"""
+    global _dashboard_version
+    _dashboard_version += 1
+
+
+def _get_cached_dashboard() -> Optional[DashboardResponse]:
+    """返回仍有效的缓存，已过期或已失效时返回 None"""
+    if (
+        _dashboard_cache["v"] is not None
+        and _dashboard_cache["version"] == _dashboard_version
+        and time.monotonic() - _dashboard_cache["t"] < SETTINGS.dashboard_cache_ttl
+    ):
+        return _dashboard_cache["v"]
+    return None
+
+
+async def _safe_aria2_stat() -> Aria2Stats:
+    """获取 Aria2 统计 (Aria2 不可用时返回默认值)"""
+    try:
+        aria2_client = get_aria2_client()
+        global_stat = await aria2_client.get_global_stat()
+        return Aria2Stats(
+            download_speed=int(global_stat.get("downloadSpeed", 0)),
+            upload_speed=int(global_stat.get("uploadSpeed", 0)),
+            active_count=int(global_stat.get("numActive", 0)),
+            waiting_count=int(global_stat.get("numWaiting", 0)),
+            stopped_count=int(global_stat.get("numStopped", 0))
+        )
+    except Exception:
+        return Aria2Stats(
+            download_speed=0,
+            upload_speed=0,
+            active_count=0,
+            waiting_count=0,
+            stopped_count=0
+        )
+
+
+async def _query_dashboard(
+    db: AsyncSession
+) -> Tuple[DashboardStats, LinodeStatus, float]:
+    """
+    查询仪表盘的数据库部分 (任务统计、运行中实例、本月费用)
+    
+    三类数据通过 UNION ALL 合并为一条语句，仅一次数据库往返，
+    以首列 kind 区分行类型:
+    - linode: label=IP, num=linode_id, amount=小时费用, ready_at, secret=root 密码
+    - status: label=任务状态, num=任务数
+    - cost:   amount=本月累计费用 (读取 Config 中的计数器行)
+    """
+    # SQLite 不允许在 UNION 成员中直接使用 LIMIT，需包一层子查询
+    running_linode = (
+        select(
+            Linode.ip_address,
+            Linode.linode_id,
+            Linode.hourly_cost,
+            Linode.ready_at,
+            Linode.root_password
+        )
+        .where(Linode.status == LinodeStatusEnum.RUNNING)
+        .limit(1)
+        .subquery()
+    )
+    
+    # 首个成员决定结果列类型，因此 linode 行放在最前
+    stmt = union_all(
+        select(
+            literal("linode").label("kind"),
+            running_linode.c.ip_address.label("label"),
+            running_linode.c.linode_id.label("num"),
+            running_linode.c.hourly_cost.label("amount"),
+            running_linode.c.ready_at.label("ready_at"),
+            running_linode.c.root_password.label("secret")
+        ),
+        select(
+            literal("status"), Task.status, func.count(), null(), null(), null()
+        ).group_by(Task.status),
+        select(
+            literal("cost"),
+            null(),
+            null(),
+            cast(Config.value, Float),
+            null(),
+            null()
+        ).where(Config.key == current_monthly_cost_key())
+    )
+    rows = (await db.execute(stmt)).all()
     
-    # 1. 统计各状态的任务数
     stats = DashboardStats(
         pending_count=0,
         confirmed_count=0,
@@ -34,79 +137,49 @@ async def get_dashboard(db: AsyncSession = Depends(get_db)):
         completed_count=0,
         error_count=0
     )
-    
-    status_counts = await db.execute(
-        select(Task.status, func.count())
-        .group_by(Task.status)
-    )
-    for status, count in status_counts:
-        if status == TaskStatus.PENDING.value:
-            stats.pending_count = count
-        elif status == TaskStatus.CONFIRMED.value:
-            stats.confirmed_count = count
-        elif status == TaskStatus.DOWNLOADING.value:
-            stats.downloading_count = count
-        elif status == TaskStatus.COMPLETE.value:
-            stats.completed_count = count
-        elif status == TaskStatus.ERROR.value:
-            stats.error_count = count
-    
-    # 2. 获取运行中的 Linode 状态
     linode_status = LinodeStatus(
         is_running=False,
         estimated_cost=0.0
     )
+    monthly_cost = 0.0
     
-    running_linode_stmt = select(Linode).where(
-        Linode.status == LinodeStatusEnum.RUNNING.value
-    ).limit(1)
-    result = await db.execute(running_linode_stmt)
-    running_linode = result.scalar_one_or_none()
-    
-    if running_linode:
-        uptime = 0
-        if running_linode.ready_at:
-            uptime = int(
-                (datetime.now() - running_linode.ready_at).total_seconds() / 60
+    for kind, label, num, amount, ready_at, secret in rows:
+        if kind == "status":
+            # 1. 统计各状态的任务数
+            field = _STATUS_TO_FIELD.get(label)
+            if field:
+                setattr(stats, field, num)
+        elif kind == "linode":
+            # 2. 运行中的 Linode 状态
+            uptime = 0
+            if ready_at:
+                uptime = int(
+                    (datetime.now() - ready_at).total_seconds() / 60
+                )
+            
+            linode_status = LinodeStatus(
+                is_running=True,
+                linode_id=num,
+                ip_address=label,
+                root_password=secret,
+                uptime_minutes=uptime,
+                estimated_cost=(amount or 0.0) * (uptime / 60)
             )
-        
-        linode_status = LinodeStatus(
-            is_running=True,
-            linode_id=running_linode.linode_id,
-            ip_address=running_linode.ip_address,
-            root_password=running_linode.root_password,
-            uptime_minutes=uptime,
-            estimated_cost=running_linode.hourly_cost * (uptime / 60)
-        )
+        elif kind == "cost":
+            # 3. 本月累计费用
+            monthly_cost = amount or 0.0
     
-    # 3. 获取 Aria2 统计
-    aria2_stats = Aria2Stats(
-        download_speed=0,
-        upload_speed=0,
-        active_count=0,
-        waiting_count=0,
-        stopped_count=0
-    )
-    
-    try:
-        aria2_client = get_aria2_client()
-        global_stat = await aria2_client.get_global_stat()
-        aria2_stats = Aria2Stats(
-            download_speed=int(global_stat.get("downloadSpeed", 0)),
-            upload_speed=int(global_stat.get("uploadSpeed", 0)),
-            active_count=int(global_stat.get("numActive", 0)),
-            waiting_count=int(global_stat.get("numWaiting", 0)),
-            stopped_count=int(global_stat.get("numStopped", 0))
-        )
-    except Exception:
-        pass  # Aria2 不可用时保持默认值
-    
-    # 4. 计算本月累计费用
-    monthly_cost_stmt = select(func.sum(Linode.total_minutes * Linode.hourly_cost / 60)).where(
-        Linode.created_at >= datetime.now().replace(day=1, hour=0, minute=0, second=0)
+    return stats, linode_status, monthly_cost
+
+
+async def _build_dashboard(db: AsyncSession) -> DashboardResponse:
+    """构建仪表盘响应"""
+    # 数据库查询与 Aria2 RPC 相互独立，并发执行
+    # (AsyncSession 不支持并发使用，数据库查询在同一协程内顺序执行)
+    (stats, linode_status, monthly_cost), aria2_stats = await asyncio.gather(
+        _query_dashboard(db),
+        _safe_aria2_stat()
     )
-    cost_result = await db.execute(monthly_cost_stmt)
-    monthly_cost = cost_result.scalar() or 0.0
     
     return DashboardResponse(
         stats=stats,
@@ -116,6 +189,25 @@ async def get_dashboard(db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(db: AsyncSession = Depends(get_db)):
+    """获取仪表盘数据"""
+    cached = _get_cached_dashboard()
+    if cached is not None:
+        return cached
+    
+    async with _dashboard_lock:
+        # 双重检查: 等锁期间可能已被其他请求刷新
+        cached = _get_cached_dashboard()
+        if cached is not None:
+            return cached
+        
+        version = _dashboard_version
+        response = await _build_dashboard(db)
+        _dashboard_cache.update(t=time.monotonic(), v=response, version=version)
+        return response
+
+
 @router.post("/emergency-destroy", response_model=EmergencyDestroyResponse)
 async def emergency_destroy():
     """
@@ -125,6 +217,7 @@ async def emergency_destroy():
     """
     orchestrator = get_orchestrator()
     destroyed_count = await orchestrator.emergency_destroy_all()
+    invalidate_dashboard_cache()
     
     return EmergencyDestroyResponse(
         message=f"已销毁 {destroyed_count} 个实例",
@@ -137,7 +230,7 @@ async def check_proxy_ip(db: AsyncSession = Depends(get_db)):
     """检查当前代理的出口 IP"""
     # 获取运行中的实例
     stmt = select(Linode).where(
-        Linode.status == LinodeStatusEnum.RUNNING.value
+        Linode.status == LinodeStatusEnum.RUNNING
     ).limit(1)
     result = await db.execute(stmt)
     linode = result.scalar_one_or_none()
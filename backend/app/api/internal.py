@@ -2,16 +2,44 @@
 内部 API (供采集器调用)
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import IntegrityError
 
+from app.api.dashboard import invalidate_dashboard_cache
 from app.core.database import get_db
 from app.models import Task, TaskStatus
-from app.schemas import TaskCreate, TaskResponse, MessageResponse
+from app.schemas import (
+    TaskCreate,
+    TaskBulkCreate,
+    TaskBulkCreateResponse,
+    TaskResponse,
+    MessageResponse,
+)
 
 router = APIRouter(prefix="/tasks/internal", tags=["internal"])
 
+# 去重键: 与唯一索引 idx_tasks_telegram 的列一致
+_DEDUP_KEY = [Task.telegram_chat_id, Task.telegram_msg_id]
+
+
+def _task_values(task_data: TaskCreate) -> dict:
+    """构造插入 Task 的列值"""
+    # 多张预览图，第一张同时写入旧字段保持兼容
+    images = task_data.preview_images or (
+        [task_data.preview_image] if task_data.preview_image else []
+    )
+    return {
+        "telegram_msg_id": task_data.telegram_msg_id,
+        "telegram_chat_id": task_data.telegram_chat_id,
+        "source_url": task_data.source_url,
+        "title": task_data.title,
+        "description": task_data.description,
+        "file_size": task_data.file_size,
+        "preview_image": images[0] if images else None,
+        "preview_images": images or None,
+        "status": TaskStatus.PENDING,
+    }
+
 
 @router.post("/create", response_model=TaskResponse)
 async def create_task(
@@ -20,44 +48,51 @@ async def create_task(
 ):
     """
     创建新任务 (内部 API，供采集器调用)
+    
+    去重依赖唯一索引 idx_tasks_telegram: INSERT ... ON CONFLICT DO NOTHING RETURNING，
+    一次往返完成检查与插入，冲突时不返回行。
     """
-    # 检查是否已存在
-    existing = await db.execute(
-        select(Task).where(
-            Task.telegram_chat_id == task_data.telegram_chat_id,
-            Task.telegram_msg_id == task_data.telegram_msg_id,
-            Task.source_url == task_data.source_url
-        )
+    stmt = (
+        sqlite_insert(Task)
+        .values(**_task_values(task_data))
+        .on_conflict_do_nothing(index_elements=_DEDUP_KEY)
+        .returning(Task)
     )
-    if existing.scalar_one_or_none():
+    result = await db.execute(stmt)
+    task = result.scalar_one_or_none()
+    if task is None:
         raise HTTPException(status_code=409, detail="任务已存在")
     
-    # 创建任务
-    task = Task(
-        telegram_msg_id=task_data.telegram_msg_id,
-        telegram_chat_id=task_data.telegram_chat_id,
-        source_url=task_data.source_url,
-        title=task_data.title,
-        description=task_data.description,
-        file_size=task_data.file_size,
-        preview_image=task_data.preview_image,
-        status=TaskStatus.PENDING.value
-    )
+    await db.commit()
     
-    # 设置多张预览图
-    if task_data.preview_images:
-        task.set_preview_images_list(task_data.preview_images)
-    elif task_data.preview_image:
-        task.set_preview_images_list([task_data.preview_image])
+    invalidate_dashboard_cache()
+    return TaskResponse.model_validate(task)
+
+
+@router.post("/create-batch", response_model=TaskBulkCreateResponse)
+async def create_tasks_bulk(
+    data: TaskBulkCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    批量创建任务 (内部 API，供采集器调用)
     
-    db.add(task)
+    一条多行 INSERT ... ON CONFLICT DO NOTHING + 一次提交，
+    已存在的任务被静默跳过。
+    """
+    if not data.tasks:
+        return TaskBulkCreateResponse(created=0, skipped=0)
     
-    try:
-        await db.commit()
-        await db.refresh(task)
-    except IntegrityError:
-        await db.rollback()
-        raise HTTPException(status_code=409, detail="任务已存在")
+    stmt = (
+        sqlite_insert(Task)
+        .values([_task_values(t) for t in data.tasks])
+        .on_conflict_do_nothing(index_elements=_DEDUP_KEY)
+        .returning(Task.id)
+    )
+    result = await db.execute(stmt)
+    created = len(result.all())
+    await db.commit()
     
-    return TaskResponse.from_task(task)
-
+    if created:
+        invalidate_dashboard_cache()
+    return TaskBulkCreateResponse(created=created, skipped=len(data.tasks) - created)
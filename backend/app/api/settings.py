@@ -1,19 +1,58 @@
 """
 设置管理 API 路由
 """
+import asyncio
 import json
-from typing import List, Optional
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import aiofiles
+import aiofiles.os
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import delete, literal_column, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.models import Config
+from app.models import Channel
+from app.schemas import MessageResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
+# 采集器监听的重载标记文件
+RELOAD_FLAG_PATH = Path("/data/reload_channels")
+
+# 后台写标记文件的任务引用 (防止任务被垃圾回收)
+_background_tasks: Set[asyncio.Task] = set()
+
+# 按添加顺序返回频道 (同一秒内添加的按 rowid)
+_CHANNEL_ORDER = (Channel.created_at, literal_column("channels.rowid"))
+
+# 已解析的频道列表缓存 (采集器每 30 秒轮询一次，写操作后清空)
+_channels_cache: Dict[str, Any] = {"value": None, "loaded": False}
+
+
+def _invalidate_channels_cache():
+    """清空频道列表缓存"""
+    _channels_cache["value"] = None
+    _channels_cache["loaded"] = False
+
+
+async def _write_reload_flag(channels_json: str):
+    """写入重载标记文件 (先写临时文件再原子重命名，避免采集器读到半截内容)"""
+    tmp_path = RELOAD_FLAG_PATH.with_suffix(".tmp")
+    try:
+        async with aiofiles.open(tmp_path, "w") as f:
+            await f.write(channels_json)
+        await aiofiles.os.replace(tmp_path, RELOAD_FLAG_PATH)
+    except OSError as e:
+        logger.warning(f"写入频道重载标记失败: {e}")
+
 
 class ChannelItem(BaseModel):
     """频道项"""
@@ -41,25 +80,17 @@ class SettingsResponse(BaseModel):
 @router.get("/channels", response_model=ChannelsResponse)
 async def get_channels(db: AsyncSession = Depends(get_db)):
     """获取监听的频道列表"""
+    if _channels_cache["loaded"]:
+        return ChannelsResponse(channels=_channels_cache["value"])
+    
     result = await db.execute(
-        select(Config).where(Config.key == "telegram_channels")
+        select(Channel.id, Channel.name).order_by(*_CHANNEL_ORDER)
     )
-    config = result.scalar_one_or_none()
+    channels = [ChannelItem(id=ch_id, name=name) for ch_id, name in result.all()]
     
-    if not config:
-        return ChannelsResponse(channels=[])
-    
-    try:
-        raw_channels = json.loads(config.value)
-        channels = []
-        for ch in raw_channels:
-            if isinstance(ch, dict):
-                channels.append(ChannelItem(**ch))
-            else:
-                channels.append(ChannelItem(id=str(ch)))
-        return ChannelsResponse(channels=channels)
-    except json.JSONDecodeError:
-        return ChannelsResponse(channels=[])
+    _channels_cache["value"] = channels
+    _channels_cache["loaded"] = True
+    return ChannelsResponse(channels=channels)
 
 
 @router.put("/channels", response_model=ChannelsResponse)
@@ -67,39 +98,26 @@ async def update_channels(
     data: ChannelsUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    """更新监听的频道列表"""
-    # 序列化为 JSON
-    channels_json = json.dumps(
-        [{"id": ch.id, "name": ch.name} for ch in data.channels],
-        ensure_ascii=False
-    )
-    
-    # 查找或创建配置
-    result = await db.execute(
-        select(Config).where(Config.key == "telegram_channels")
-    )
-    config = result.scalar_one_or_none()
-    
-    if config:
-        config.value = channels_json
-    else:
-        config = Config(
-            key="telegram_channels",
-            value=channels_json,
-            description="监听的 Telegram 频道列表"
-        )
-        db.add(config)
-    
+    """更新监听的频道列表 (整体替换)"""
+    # 重复的频道 ID 只保留第一个
+    channels: Dict[str, ChannelItem] = {}
+    for ch in data.channels:
+        channels.setdefault(ch.id, ch)
+    rows = [{"id": ch.id, "name": ch.name} for ch in channels.values()]
+    
+    await db.execute(delete(Channel))
+    if rows:
+        await db.execute(sqlite_insert(Channel), rows)
     await db.commit()
+    _invalidate_channels_cache()
     
-    # 通知采集器重载 (通过写入一个标记文件)
-    import aiofiles
-    from pathlib import Path
-    reload_flag = Path("/data/reload_channels")
-    async with aiofiles.open(reload_flag, "w") as f:
-        await f.write(channels_json)
+    # 通知采集器重载 (后台写入标记文件，不阻塞响应)
+    channels_json = json.dumps(rows, ensure_ascii=False)
+    task = asyncio.create_task(_write_reload_flag(channels_json))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
     
-    return ChannelsResponse(channels=data.channels)
+    return ChannelsResponse(channels=list(channels.values()))
 
 
 @router.post("/channels", response_model=ChannelItem)
@@ -107,80 +125,33 @@ async def add_channel(
     channel: ChannelItem,
     db: AsyncSession = Depends(get_db)
 ):
-    """添加新频道"""
-    # 获取现有频道
+    """添加新频道 (主键冲突即为已存在)"""
     result = await db.execute(
-        select(Config).where(Config.key == "telegram_channels")
+        sqlite_insert(Channel)
+        .values(id=channel.id, name=channel.name)
+        .on_conflict_do_nothing()
+        .returning(Channel.id)
     )
-    config = result.scalar_one_or_none()
-    
-    channels = []
-    if config:
-        try:
-            raw = json.loads(config.value)
-            for ch in raw:
-                if isinstance(ch, dict):
-                    channels.append(ch)
-                else:
-                    channels.append({"id": str(ch)})
-        except json.JSONDecodeError:
-            pass
-    
-    # 检查是否已存在
-    if any(ch["id"] == channel.id for ch in channels):
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=400, detail="频道已存在")
     
-    # 添加新频道
-    channels.append({"id": channel.id, "name": channel.name})
-    
-    channels_json = json.dumps(channels, ensure_ascii=False)
-    
-    if config:
-        config.value = channels_json
-    else:
-        config = Config(
-            key="telegram_channels",
-            value=channels_json,
-            description="监听的 Telegram 频道列表"
-        )
-        db.add(config)
-    
     await db.commit()
+    _invalidate_channels_cache()
     
     return channel
 
 
-@router.delete("/channels/{channel_id}")
+@router.delete("/channels/{channel_id}", response_model=MessageResponse)
 async def delete_channel(
     channel_id: str,
     db: AsyncSession = Depends(get_db)
 ):
     """删除频道"""
-    result = await db.execute(
-        select(Config).where(Config.key == "telegram_channels")
-    )
-    config = result.scalar_one_or_none()
-    
-    if not config:
+    result = await db.execute(delete(Channel).where(Channel.id == channel_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="频道不存在")
     
-    try:
-        raw = json.loads(config.value)
-        channels = []
-        found = False
-        for ch in raw:
-            ch_id = ch["id"] if isinstance(ch, dict) else str(ch)
-            if ch_id != channel_id:
-                channels.append(ch if isinstance(ch, dict) else {"id": ch_id})
-            else:
-                found = True
-        
-        if not found:
-            raise HTTPException(status_code=404, detail="频道不存在")
-        
-        config.value = json.dumps(channels, ensure_ascii=False)
-        await db.commit()
-        
-        return {"message": "删除成功"}
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="配置解析失败")
+    await db.commit()
+    _invalidate_channels_cache()
+    
+    return MessageResponse(message="删除成功")
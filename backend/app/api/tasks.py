@@ -2,12 +2,15 @@
 任务相关 API 路由
 """
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from fastapi.responses import Response
+from sqlalchemy import Integer, case, select, func, literal, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from app.api.dashboard import invalidate_dashboard_cache
 from app.core.database import get_db
 from app.models import Task, TaskStatus
 from app.schemas import (
@@ -16,38 +19,159 @@ from app.schemas import (
     PendingTasksResponse,
     MessageResponse
 )
+from app.services import get_orchestrator
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# JSON 布尔值 (SQLite 没有布尔类型，经 json() 转换后在 json_object 中输出 true/false)
+_JSON_TRUE = literal("true")
+_JSON_FALSE = literal("false")
 
-@router.get("/pending", response_model=PendingTasksResponse)
+# 列表响应直接返回 SQLite 生成的 JSON 文本，模型仅用于 OpenAPI 文档
+_PAGE_RESPONSES = {200: {"model": PendingTasksResponse}}
+
+# 总数统计上限 (超过后前端显示为 "1000+")
+TOTAL_COUNT_CAP = 1000
+
+# 列表接口只读，直接查询响应所需的列 (在 SQL 中拼成 JSON 返回)
+_TASK_COLUMNS = (
+    Task.id,
+    Task.telegram_msg_id,
+    Task.telegram_chat_id,
+    Task.source_url,
+    Task.title,
+    Task.description,
+    Task.file_size,
+    Task.preview_image,
+    Task.preview_images,
+    Task.status,
+    Task.batch_id,
+    Task.aria2_gids,
+    Task.error_message,
+    Task.created_at,
+    Task.confirmed_at,
+    Task.completed_at,
+)
+
+
+def _apply_page(stmt, cursor: Optional[int], offset: int, limit: int):
+    """
+    为任务列表查询附加排序与分页
+    
+    传入 cursor (上一页最后一个任务的 ID) 时使用键集分页:
+    (created_at, id) 严格小于游标任务，可直接沿索引定位，无需扫描并丢弃
+    OFFSET 之前的行；未传入时退回 OFFSET 分页以兼容旧客户端。
+    """
+    if cursor is not None:
+        anchor = aliased(Task)
+        stmt = stmt.where(
+            tuple_(Task.created_at, Task.id) < tuple_(
+                select(anchor.created_at).where(anchor.id == cursor).scalar_subquery(),
+                cursor
+            )
+        )
+    else:
+        stmt = stmt.offset(offset)
+    return stmt.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit)
+
+
+async def _count_capped(db: AsyncSession, conditions) -> Tuple[int, bool]:
+    """
+    统计满足条件的任务数，最多数到 TOTAL_COUNT_CAP
+    
+    对 LIMIT 子查询计数 (多取一行用于判断是否超出)，扫描的行数有上界；
+    返回 (数量, 是否超过上限)。
+    """
+    inner = select(literal(1)).select_from(Task)
+    if conditions:
+        inner = inner.where(*conditions)
+    stmt = select(func.count()).select_from(inner.limit(TOTAL_COUNT_CAP + 1).subquery())
+    total = (await db.execute(stmt)).scalar()
+    return min(total, TOTAL_COUNT_CAP), total > TOTAL_COUNT_CAP
+
+
+def _iso(column):
+    """SQLite 日期文本转为与 Pydantic 一致的 ISO 格式 (空格替换为 T)"""
+    return func.replace(column, " ", "T")
+
+
+async def _page_json(
+    db: AsyncSession,
+    page_stmt,
+    limit: int,
+    total: Optional[int],
+    total_capped: bool
+) -> str:
+    """
+    在 SQLite 中把一页任务连同分页信息直接拼成 PendingTasksResponse 格式的 JSON
+    
+    json_object 的字段与 TaskResponse 一致，preview_images 为空时
+    回退到单图字段，跳过逐行构造 ORM/Pydantic 对象。
+    """
+    page = page_stmt.subquery()
+    c = page.c
+    preview_images = func.json(
+        case(
+            (func.json_array_length(c.preview_images) > 0, c.preview_images),
+            (c.preview_image.is_not(None), func.json_array(c.preview_image)),
+            else_="[]"
+        )
+    )
+    task_json = func.json_object(
+        "source_url", c.source_url,
+        "title", c.title,
+        "description", c.description,
+        "file_size", c.file_size,
+        "preview_image", c.preview_image,
+        "preview_images", preview_images,
+        "id", c.id,
+        "telegram_msg_id", c.telegram_msg_id,
+        "telegram_chat_id", c.telegram_chat_id,
+        "status", c.status,
+        "batch_id", c.batch_id,
+        "aria2_gids", func.json(c.aria2_gids),
+        "error_message", c.error_message,
+        "created_at", _iso(c.created_at),
+        "confirmed_at", _iso(c.confirmed_at),
+        "completed_at", _iso(c.completed_at),
+    )
+    # 聚合按子查询的排序依次处理各行，数组顺序即分页顺序；
+    # 取满一页时以最后一个任务的 ID 作为下一页游标
+    next_cursor = case(
+        (func.count() >= limit, func.json_extract(func.json_group_array(c.id), "$[#-1]")),
+        else_=None
+    )
+    envelope = func.json_object(
+        "tasks", func.json(func.coalesce(func.json_group_array(task_json), "[]")),
+        "total", literal(total, Integer),
+        "total_capped", func.json(_JSON_TRUE if total_capped else _JSON_FALSE),
+        "next_cursor", next_cursor,
+    )
+    return (await db.execute(select(envelope).select_from(page))).scalar_one()
+
+
+@router.get("/pending", response_class=Response, responses=_PAGE_RESPONSES)
 async def get_pending_tasks(
     limit: int = Query(default=20, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[int] = Query(default=None, description="上一页最后一个任务的 ID"),
+    include_total: bool = Query(default=False, description="是否返回总数 (最多统计到 1000)"),
     db: AsyncSession = Depends(get_db)
 ):
     """获取待筛选的任务列表"""
-    # 查询总数
-    count_stmt = select(func.count()).select_from(Task).where(
-        Task.status == TaskStatus.PENDING.value
-    )
-    count_result = await db.execute(count_stmt)
-    total = count_result.scalar()
+    # 查询总数 (可选，有上限)
+    total, total_capped = None, False
+    if include_total:
+        total, total_capped = await _count_capped(db, [Task.status == TaskStatus.PENDING])
     
     # 查询任务列表
-    stmt = (
-        select(Task)
-        .where(Task.status == TaskStatus.PENDING.value)
-        .order_by(Task.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+    stmt = _apply_page(
+        select(*_TASK_COLUMNS).where(Task.status == TaskStatus.PENDING),
+        cursor, offset, limit
     )
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    
-    return PendingTasksResponse(
-        tasks=[TaskResponse.from_task(t) for t in tasks],
-        total=total
+    return Response(
+        content=await _page_json(db, stmt, limit, total, total_capped),
+        media_type="application/json"
     )
 
 
@@ -61,7 +185,7 @@ async def get_task(
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    return TaskResponse.from_task(task)
+    return TaskResponse.model_validate(task)
 
 
 @router.post("/{task_id}/action", response_model=TaskResponse)
@@ -76,33 +200,46 @@ async def task_action(
     - **confirm**: 确认下载 (左滑)
     - **ignore**: 忽略任务 (右滑)
     """
-    task = await db.get(Task, task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="任务不存在")
+    if action.action == "confirm":
+        values = {"status": TaskStatus.CONFIRMED, "confirmed_at": datetime.now()}
+    else:
+        values = {"status": TaskStatus.IGNORED}
+    
+    # 条件更新一次往返完成 "检查 PENDING + 修改状态 + 读回任务"
+    stmt = (
+        update(Task)
+        .where(Task.id == task_id, Task.status == TaskStatus.PENDING)
+        .values(**values)
+        .returning(Task)
+    )
+    task = (await db.execute(stmt)).scalar_one_or_none()
     
-    if task.status != TaskStatus.PENDING.value:
+    if task is None:
+        # 未更新时再查询一次，区分任务不存在与状态不符
+        task = await db.get(Task, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="任务不存在")
         raise HTTPException(
             status_code=400, 
-            detail=f"任务状态为 {task.status}，无法执行此操作"
+            detail=f"任务状态为 {task.status.value}，无法执行此操作"
         )
     
-    if action.action == "confirm":
-        task.status = TaskStatus.CONFIRMED.value
-        task.confirmed_at = datetime.now()
-    elif action.action == "ignore":
-        task.status = TaskStatus.IGNORED.value
-    
     await db.commit()
-    await db.refresh(task)
+    invalidate_dashboard_cache()
+    if action.action == "confirm":
+        # 唤醒编排引擎立即处理，不必等待下一轮轮询
+        get_orchestrator().notify_new_task()
     
-    return TaskResponse.from_task(task)
+    return TaskResponse.model_validate(task)
 
 
-@router.get("", response_model=PendingTasksResponse)
+@router.get("", response_class=Response, responses=_PAGE_RESPONSES)
 async def list_tasks(
     status: Optional[str] = Query(default=None),
     limit: int = Query(default=20, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[int] = Query(default=None, description="上一页最后一个任务的 ID"),
+    include_total: bool = Query(default=False, description="是否返回总数 (最多统计到 1000)"),
     db: AsyncSession = Depends(get_db)
 ):
     """获取任务列表 (可按状态过滤)"""
@@ -111,21 +248,17 @@ async def list_tasks(
     if status:
         conditions.append(Task.status == status)
     
-    # 查询总数
-    count_stmt = select(func.count()).select_from(Task)
-    if conditions:
-        count_stmt = count_stmt.where(*conditions)
-    count_result = await db.execute(count_stmt)
-    total = count_result.scalar()
+    # 查询总数 (可选，有上限)
+    total, total_capped = None, False
+    if include_total:
+        total, total_capped = await _count_capped(db, conditions)
     
     # 查询列表
-    stmt = select(Task).order_by(Task.created_at.desc()).offset(offset).limit(limit)
+    stmt = select(*_TASK_COLUMNS)
     if conditions:
         stmt = stmt.where(*conditions)
-    result = await db.execute(stmt)
-    tasks = result.scalars().all()
-    
-    return PendingTasksResponse(
-        tasks=[TaskResponse.from_task(t) for t in tasks],
-        total=total
+    stmt = _apply_page(stmt, cursor, offset, limit)
+    return Response(
+        content=await _page_json(db, stmt, limit, total, total_capped),
+        media_type="application/json"
     )
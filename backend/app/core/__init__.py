@@ -1,7 +1,7 @@
 """
 核心模块
 """
-from app.core.config import Settings, get_settings
+from app.core.config import SETTINGS, Settings, get_settings
 from app.core.database import get_db, get_db_context, init_db
 
-__all__ = ["Settings", "get_settings", "get_db", "get_db_context", "init_db"]
+__all__ = ["SETTINGS", "Settings", "get_settings", "get_db", "get_db_context", "init_db"]
@@ -1,7 +1,7 @@
 """
 核心配置模块
 """
-from functools import lru_cache
+import json
 from pathlib import Path
 from typing import List, Optional, Union
 
@@ -21,6 +21,8 @@ class Settings(BaseSettings):
     
     # 数据库
     database_path: str = Field(default="/data/swipe.db", alias="DATABASE_PATH")
+    db_pool_size: int = Field(default=8, alias="DB_POOL_SIZE")  # 常驻连接数
+    db_max_overflow: int = Field(default=4, alias="DB_MAX_OVERFLOW")  # 高峰期额外连接数
     
     # Telegram
     telegram_api_id: Optional[int] = Field(default=None, alias="TELEGRAM_API_ID")
@@ -51,6 +53,9 @@ class Settings(BaseSettings):
     batch_task_threshold: int = Field(default=10, alias="BATCH_TASK_THRESHOLD")
     idle_destroy_minutes: int = Field(default=15, alias="IDLE_DESTROY_MINUTES")
     download_base_path: str = Field(default="/downloads", alias="DOWNLOAD_BASE_PATH")
+    pikpak_concurrency: int = Field(default=5, ge=1, alias="PIKPAK_CONCURRENCY")  # 同时处理的 PikPak 任务数 (至少 1)
+    confirm_batch_size: int = Field(default=20, ge=1, alias="CONFIRM_BATCH_SIZE")  # 每轮最多处理的已确认任务数
+    dashboard_cache_ttl: float = Field(default=3.0, alias="DASHBOARD_CACHE_TTL")  # 仪表盘缓存秒数
     
     # 预览图路径
     previews_path: str = Field(default="/data/previews", alias="PREVIEWS_PATH")
@@ -62,14 +67,16 @@ class Settings(BaseSettings):
     
     def get_telegram_channels(self) -> List[Union[str, int]]:
         """解析 Telegram 频道列表"""
-        import json
         try:
             return json.loads(self.telegram_channels)
         except json.JSONDecodeError:
             return []
 
 
-@lru_cache
+# 配置在进程启动时加载一次，之后只读
+SETTINGS = Settings()
+
+
 def get_settings() -> Settings:
     """获取配置单例"""
-    return Settings()
+    return SETTINGS
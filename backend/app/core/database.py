@@ -1,10 +1,14 @@
 """
 数据库连接与会话管理
 """
+import json
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
+import orjson
+from sqlalchemy import delete, event, func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import get_settings
@@ -19,9 +23,36 @@ db_path.parent.mkdir(parents=True, exist_ok=True)
 engine = create_async_engine(
     settings.database_url,
     echo=False,
-    future=True
+    future=True,
+    # 连接复用: 每个连接建立时执行的 PRAGMA 只需付出一次
+    # (SQLite 为本地文件，无需 pool_pre_ping / pool_recycle)
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    connect_args={"timeout": 30},  # 锁等待超时 (秒)，避免并发写入时立即报 database is locked
+    # JSON 列使用 orjson 序列化/反序列化
+    json_serializer=lambda value: orjson.dumps(value).decode(),
+    json_deserializer=orjson.loads
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    每个新连接设置 SQLite PRAGMA
+    
+    WAL 让读 (仪表盘轮询) 不阻塞写 (采集器插入)，
+    synchronous=NORMAL 在 WAL 下仅在检查点时 fsync。
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
 # 创建异步会话工厂
 async_session_maker = async_sessionmaker(
     engine,
@@ -31,11 +62,17 @@ async_session_maker = async_sessionmaker(
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """获取数据库会话 (用于 FastAPI 依赖注入)"""
+    """
+    获取数据库会话 (用于 FastAPI 依赖注入)
+    
+    仅当 ORM 对象有未提交的变更时才自动提交，只读请求直接关闭会话。
+    通过 db.execute() 执行的 Core 写语句不会被跟踪，需在路由内显式 commit。
+    """
     async with async_session_maker() as session:
         try:
             yield session
-            await session.commit()
+            if session.new or session.dirty or session.deleted:
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -53,8 +90,81 @@ async def get_db_context() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+def _create_missing_indexes(sync_conn):
+    """
+    为已存在的表补建新增索引
+    
+    create_all 会跳过已存在的表 (连同其索引)，
+    旧数据库需要逐个检查并创建模型中新增的索引。
+    """
+    from app.models import Base
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+# 已被取代的旧索引 (复合索引的前缀列即可满足原查询；
+# idx_tasks_telegram_source 的去重由更严格的 idx_tasks_telegram 覆盖)
+_OBSOLETE_INDEXES = ("idx_tasks_status", "idx_batches_status", "idx_tasks_telegram_source")
+
+
+def _drop_obsolete_indexes(sync_conn):
+    """删除旧数据库中已被取代的索引，减少写入时的索引维护开销"""
+    for name in _OBSOLETE_INDEXES:
+        sync_conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _migrate_channels_from_config(sync_conn):
+    """
+    将旧版 Config 中的 telegram_channels JSON 迁移到 channels 表
+    
+    仅在 channels 表为空时执行，迁移完成后删除旧配置行。
+    """
+    from app.models import Channel, Config
+    
+    value = sync_conn.execute(
+        select(Config.value).where(Config.key == "telegram_channels")
+    ).scalar_one_or_none()
+    if value is None:
+        return
+    if sync_conn.execute(select(func.count()).select_from(Channel)).scalar():
+        return
+    
+    try:
+        raw = json.loads(value)
+    except json.JSONDecodeError:
+        raw = []
+    rows = [
+        {"id": str(ch["id"]), "name": ch.get("name")} if isinstance(ch, dict)
+        else {"id": str(ch), "name": None}
+        for ch in raw
+    ]
+    if rows:
+        sync_conn.execute(sqlite_insert(Channel).on_conflict_do_nothing(), rows)
+    sync_conn.execute(delete(Config).where(Config.key == "telegram_channels"))
+
+
+def _normalize_json_columns(sync_conn):
+    """
+    清理 JSON 列中的非法旧数据
+    
+    preview_images / aria2_gids 曾以 Text 存储 JSON 字符串，合法数组无需转换；
+    无法解析或不是数组的值置空，避免读取时反序列化失败。
+    """
+    for column in ("preview_images", "aria2_gids"):
+        sync_conn.execute(text(
+            f"UPDATE tasks SET {column} = NULL "
+            f"WHERE {column} IS NOT NULL AND CASE WHEN json_valid({column}) "
+            f"THEN json_type({column}) != 'array' ELSE 1 END"
+        ))
+
+
 async def init_db():
-    """初始化数据库 (创建所有表)"""
+    """初始化数据库 (创建所有表及缺失的索引，迁移旧数据)"""
     from app.models import Base
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_drop_obsolete_indexes)
+        await conn.run_sync(_migrate_channels_from_config)
+        await conn.run_sync(_normalize_json_columns)
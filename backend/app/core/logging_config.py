@@ -1,15 +1,33 @@
+import atexit
 import os
 import logging
 import logging.handlers
+import queue
 import sys
 from pathlib import Path
+from typing import Optional
+
+# 后台写日志的监听线程 (重复调用 setup_logging 时先停止旧的)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@atexit.register
+def _stop_listener():
+    """退出时停止当前监听线程，写完队列中剩余的日志 (只注册一次，重复配置时不会重复停止)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def setup_logging(name: str = "backend", level=logging.INFO):
     """
     统一的日志配置
     - 格式包含时间、级别、文件名、行号、函数名
     - 支持控制台输出和文件滚动持久化
+    - 根日志只把记录放入队列，控制台/文件写入在后台线程完成，不阻塞事件循环
     """
+    global _listener
     log_format = "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(funcName)s - %(message)s"
     
     # 获取日志目录，优先使用环境变量
@@ -28,15 +46,18 @@ def setup_logging(name: str = "backend", level=logging.INFO):
     root_logger = logging.getLogger()
     
     # 清理旧的 handler
+    _stop_listener()
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
         
     root_logger.setLevel(level)
     
+    handlers = []
+    
     # 控制台 Handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(logging.Formatter(log_format))
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # 文件滚动 Handler
     try:
@@ -47,8 +68,16 @@ def setup_logging(name: str = "backend", level=logging.INFO):
             encoding="utf-8"
         )
         file_handler.setFormatter(logging.Formatter(log_format))
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
         print(f"Failed to setup file logging: {e}")
     
+    # 队列 Handler + 后台监听线程
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    
     return logging.getLogger(name)
@@ -0,0 +1,104 @@
+"""
+纯 ASGI 中间件
+
+直接处理 ASGI 消息，不构造 Request/Response 对象，
+避免 BaseHTTPMiddleware 每个请求额外的协程与对象分配。
+"""
+from typing import Dict, List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+Headers = List[Tuple[bytes, bytes]]
+
+# 预检响应的固定头部 (允许所有方法，缓存 10 分钟)
+_PREFLIGHT_HEADERS: Headers = [
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-max-age", b"600"),
+    (b"vary", b"Origin"),
+    (b"content-type", b"text/plain; charset=utf-8"),
+    (b"content-length", b"2"),
+]
+
+# 普通跨域响应追加的固定头部
+_SIMPLE_HEADERS: Headers = [
+    (b"access-control-allow-credentials", b"true"),
+    (b"vary", b"Origin"),
+]
+
+
+class CORSMiddleware:
+    """
+    允许任意来源的 CORS 中间件 (生产环境应限制具体域名)
+
+    带凭据的请求不能使用 "*"，因此回显请求的 Origin；
+    预检请求在中间件内直接返回，不进入路由。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+            elif key == b"access-control-request-method":
+                request_method = value
+            elif key == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 预检请求
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = _PREFLIGHT_HEADERS.copy()
+            headers.append((b"access-control-allow-origin", origin))
+            if request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        async def send_with_cors(message: Message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"access-control-allow-origin", origin))
+                headers.extend(_SIMPLE_HEADERS)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+class ExactPathMiddleware:
+    """
+    精确路径快速分发中间件
+
+    路径 (原始字节) 与请求方法均命中时直接交给对应的 ASGI 应用处理，
+    跳过 FastAPI 路由匹配与依赖注入；否则交给下游应用 (由路由返回 404/405)。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Dict[bytes, ASGIApp],
+        methods: Tuple[str, ...] = ("GET", "HEAD")
+    ):
+        self.app = app
+        self.routes = routes
+        self.methods = methods
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["method"] in self.methods:
+            handler = self.routes.get(scope.get("raw_path") or scope["path"].encode())
+            if handler is not None:
+                await handler(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,180 @@
+"""
+预览图静态文件服务 (纯 ASGI)
+
+使用 mmap 映射文件，由内核页缓存承载文件内容，多个进程共享同一份物理页；
+最近访问的映射保存在 LRU 中，重复请求无需再次 open()/mmap()。
+被淘汰的映射不主动 close，在最后一个引用释放、由垃圾回收时才解除映射。
+stat/open/mmap 与读取映射 (可能触发缺页读盘) 均在线程池中执行，不阻塞事件循环。
+支持单区间 Range 请求 (206) 与 If-None-Match (304)。
+"""
+import mimetypes
+import mmap
+import os
+import stat
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from anyio import to_thread
+from starlette.types import Receive, Scope, Send
+
+# 缓存项: (映射对象, 文件大小, mtime_ns)；空文件没有映射
+_Entry = Tuple[Optional[mmap.mmap], int, int]
+
+
+class PreviewFiles:
+    """预览图文件 ASGI 应用 (挂载到 /previews)"""
+
+    CHUNK_SIZE = 64 * 1024
+    CACHE_CONTROL = b"public, max-age=604800"
+    NOT_FOUND_HEADERS = [
+        (b"content-type", b"text/plain; charset=utf-8"),
+        (b"content-length", b"9"),
+    ]
+
+    def __init__(self, directory: str, max_cached: int = 256):
+        self.directory = Path(directory).resolve()
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _lookup(self, rel_path: str) -> Optional[Tuple[str, os.stat_result]]:
+        """
+        解析相对路径并 stat (在线程池中调用)
+
+        返回 (真实路径, stat 结果)；路径穿越、文件不存在或不是普通文件时返回 None。
+        """
+        full_path = os.path.realpath(os.path.join(self.directory, rel_path))
+        if not full_path.startswith(str(self.directory) + os.sep):
+            return None
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        return (full_path, st) if stat.S_ISREG(st.st_mode) else None
+
+    @staticmethod
+    def _map_file(full_path: str) -> mmap.mmap:
+        """只读映射整个文件 (在线程池中调用)"""
+        with open(full_path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    async def _open(self, full_path: str, size: int, mtime_ns: int) -> _Entry:
+        """获取文件映射 (命中 LRU 且文件未变化时直接复用)"""
+        entry = self._cache.get(full_path)
+        if entry is not None and entry[1] == size and entry[2] == mtime_ns:
+            self._cache.move_to_end(full_path)
+            return entry
+
+        mm = None
+        if size > 0:
+            mm = await to_thread.run_sync(self._map_file, full_path)
+        entry = (mm, size, mtime_ns)
+        self._cache[full_path] = entry
+        self._cache.move_to_end(full_path)
+        # 淘汰时不主动 close: 正在发送的响应可能仍持有映射，引用释放后自动关闭
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _parse_range(value: bytes, size: int) -> Optional[Tuple[int, int]]:
+        """
+        解析单区间 Range 头，返回闭区间 (start, end)
+
+        多区间或格式不支持时返回 None (按完整内容响应)；
+        区间不可满足时抛出 ValueError。
+        """
+        unit, _, spec = value.decode("latin-1").partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            return None
+        start_s, _, end_s = spec.strip().partition("-")
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # 后缀区间: 最后 N 个字节
+            length = int(end_s)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            start, end = max(size - length, 0), size - 1
+        end = min(end, size - 1)
+        if start > end:
+            raise ValueError("unsatisfiable range")
+        return start, end
+
+    async def _respond(self, send: Send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes = b""):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            await self._respond(send, 405, [(b"allow", b"GET, HEAD"), (b"content-length", b"0")])
+            return
+
+        # 挂载点之后的相对路径 (Mount 会把挂载前缀追加到 root_path)，并防止路径穿越
+        rel_path = scope["path"][len(scope.get("root_path", "")):].lstrip("/")
+        found = await to_thread.run_sync(self._lookup, rel_path)
+        if found is None:
+            await self._respond(send, 404, self.NOT_FOUND_HEADERS, b"Not Found")
+            return
+        full_path, st = found
+
+        size = st.st_size
+        etag = f'"{st.st_mtime_ns:x}-{size:x}"'.encode()
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        headers = [
+            (b"content-type", content_type.encode()),
+            (b"accept-ranges", b"bytes"),
+            (b"etag", etag),
+            (b"last-modified", formatdate(st.st_mtime, usegmt=True).encode()),
+            (b"cache-control", self.CACHE_CONTROL),
+        ]
+
+        request_range = None
+        for key, value in scope["headers"]:
+            if key == b"if-none-match" and etag in value:
+                await self._respond(send, 304, headers)
+                return
+            if key == b"range":
+                request_range = value
+
+        status = 200
+        start, end = 0, size - 1
+        if request_range is not None and size > 0:
+            try:
+                parsed = self._parse_range(request_range, size)
+            except ValueError:
+                headers.append((b"content-range", f"bytes */{size}".encode()))
+                headers.append((b"content-length", b"0"))
+                await self._respond(send, 416, headers)
+                return
+            if parsed is not None:
+                status = 206
+                start, end = parsed
+                headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode()))
+
+        length = end - start + 1 if size > 0 else 0
+        headers.append((b"content-length", str(length).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        if method == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        mm = (await self._open(full_path, size, st.st_mtime_ns))[0]
+        offset = start
+        while offset <= end:
+            chunk_end = min(offset + self.CHUNK_SIZE, end + 1)
+            # 切片会复制映射内容，冷页需要读盘，同样放到线程池
+            body = await to_thread.run_sync(mm.__getitem__, slice(offset, chunk_end))
+            await send({
+                "type": "http.response.body",
+                "body": body,
+                "more_body": chunk_end <= end,
+            })
+            offset = chunk_end
@@ -1,42 +1,79 @@
 """
 FastAPI 主应用
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from datetime import datetime
 from pathlib import Path
+from fastapi import FastAPI
+from starlette.types import Receive, Scope, Send
 
 from app.api import api_router
-from app.core.config import get_settings
-from app.core.database import init_db
-from app.services import get_orchestrator
+from app.core.config import SETTINGS
+from app.core.database import get_db_context, init_db
+from app.core.middleware import CORSMiddleware, ExactPathMiddleware
+from app.core.previews import PreviewFiles
+from app.services import close_aria2_client, close_linode_client, get_orchestrator
+from app.services.cost_counter import seed_monthly_cost
 
 from app.core.logging_config import setup_logging
 
 # 初始化日志
 logger = setup_logging("backend")
 
+# 预览图目录 (导入时创建一次，保证 create_app 挂载时目录已存在)
+PREVIEWS_PATH = Path(SETTINGS.previews_path)
+PREVIEWS_PATH.mkdir(parents=True, exist_ok=True)
+
+# 健康检查的预编码响应 (探针高频访问，不做任何序列化)
+HEALTH_BODY = b'{"status":"ok"}'
+HEALTH_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", b"15"),
+]
+_HEALTH_START = {"type": "http.response.start", "status": 200, "headers": HEALTH_HEADERS}
+_HEALTH_BODY = {"type": "http.response.body", "body": HEALTH_BODY}
+_HEALTH_HEAD_BODY = {"type": "http.response.body", "body": b""}
+
+
+async def health_check(scope: Scope, receive: Receive, send: Send):
+    """健康检查 (纯 ASGI，仅用于 GET/HEAD，返回固定响应)"""
+    await send(_HEALTH_START)
+    await send(_HEALTH_HEAD_BODY if scope["method"] == "HEAD" else _HEALTH_BODY)
+
+
+# 精确路径快速通道: 命中时不经过路由匹配
+FAST_ROUTES = {
+    b"/health": health_check,
+}
+
+
+async def _seed_monthly_cost():
+    """初始化本月费用计数器"""
+    async with get_db_context() as db:
+        await seed_monthly_cost(db, datetime.now())
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    settings = get_settings()
-    
     # 启动时
     logger.info("正在初始化数据库...")
     await init_db()
     
-    # 确保预览图目录存在
-    previews_path = Path(settings.previews_path)
-    previews_path.mkdir(parents=True, exist_ok=True)
-    
-    # 启动编排器
+    # 数据库就绪后，费用计数器初始化与编排器启动 (含远程实例同步) 互不依赖，并发执行
     logger.info("正在启动编排引擎...")
     orchestrator = get_orchestrator()
-    await orchestrator.start()
+    results = await asyncio.gather(
+        _seed_monthly_cost(),
+        orchestrator.start(),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            await orchestrator.stop()
+            raise result
     
     logger.info("应用启动完成")
     
@@ -45,13 +82,13 @@ async def lifespan(app: FastAPI):
     # 关闭时
     logger.info("正在关闭编排引擎...")
     await orchestrator.stop()
+    await close_aria2_client()
+    await close_linode_client()
     logger.info("应用已关闭")
 
 
 def create_app() -> FastAPI:
     """创建 FastAPI 应用实例"""
-    settings = get_settings()
-    
     app = FastAPI(
         title="PikPak Tinder-Swipe API",
         description="影视资源自动化收集系统 API",
@@ -59,29 +96,25 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
     
-    # CORS 中间件
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],  # 生产环境应限制具体域名
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
+    # CORS 中间件 (纯 ASGI，允许任意来源)
+    app.add_middleware(CORSMiddleware)
+    
+    # 精确路径快速通道 (最外层，健康检查等固定响应不进入路由)
+    app.add_middleware(ExactPathMiddleware, routes=FAST_ROUTES)
     
     # 注册 API 路由
     app.include_router(api_router)
     
-    # 静态文件 (预览图)
-    previews_path = Path(settings.previews_path)
-    if previews_path.exists():
-        app.mount(
-            "/previews",
-            StaticFiles(directory=str(previews_path)),
-            name="previews"
-        )
+    # 静态文件 (预览图，通常由 nginx 直接提供，这里作为回退)
+    app.mount(
+        "/previews",
+        PreviewFiles(str(PREVIEWS_PATH)),
+        name="previews"
+    )
     
+    # 常规路由: 快速通道只处理 GET/HEAD，其他方法经此返回 405 (同时出现在 OpenAPI 文档中)
     @app.get("/health")
-    async def health_check():
+    async def health():
         """健康检查"""
         return {"status": "ok"}
     
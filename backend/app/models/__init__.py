@@ -6,6 +6,7 @@ from app.models.task import Task, TaskStatus
 from app.models.batch import Batch, BatchStatus
 from app.models.linode import Linode, LinodeStatus
 from app.models.config import Config
+from app.models.channel import Channel
 
 __all__ = [
     "Base",
@@ -17,4 +18,5 @@ __all__ = [
     "Linode",
     "LinodeStatus",
     "Config",
+    "Channel",
 ]
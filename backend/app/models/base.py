@@ -4,7 +4,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -14,15 +14,22 @@ class Base(DeclarativeBase):
 
 
 class TimestampMixin:
-    """时间戳混入类"""
+    """
+    时间戳混入类
+
+    默认值在 Python 端生成 (UTC)，批量插入时参数可直接绑定；
+    server_default 作为绕过 ORM 的原生 SQL 插入的兜底。
+    """
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, 
-        default=func.now(),
+        DateTime,
+        default=datetime.utcnow,
+        server_default=text("CURRENT_TIMESTAMP"),
         nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=func.now(),
-        onupdate=func.now(),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=text("CURRENT_TIMESTAMP"),
         nullable=False
     )
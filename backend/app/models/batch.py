@@ -5,7 +5,7 @@ from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy import DateTime, Enum as SAEnum, ForeignKey, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -32,10 +32,10 @@ class Batch(Base, TimestampMixin):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     
     # 状态管理
-    status: Mapped[str] = mapped_column(
-        String(32),
+    status: Mapped[BatchStatus] = mapped_column(
+        SAEnum(BatchStatus, name="batch_status", length=32),
         nullable=False,
-        default=BatchStatus.AGGREGATING.value
+        default=BatchStatus.AGGREGATING
     )
     
     # Linode 关联
@@ -57,10 +57,10 @@ class Batch(Base, TimestampMixin):
     activated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
-    # 关系
-    tasks: Mapped[List["Task"]] = relationship("Task", back_populates="batch")
-    linode: Mapped[Optional["Linode"]] = relationship("Linode", back_populates="batches")
+    # 关系 (禁止隐式懒加载，需要时用 selectinload 显式加载)
+    tasks: Mapped[List["Task"]] = relationship("Task", back_populates="batch", lazy="raise")
+    linode: Mapped[Optional["Linode"]] = relationship("Linode", back_populates="batches", lazy="raise")
     
     __table_args__ = (
-        Index("idx_batches_status", "status"),
+        Index("idx_batches_status_created", "status", "created_at"),
     )
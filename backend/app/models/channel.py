@@ -0,0 +1,25 @@
+"""
+监听频道模型
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class Channel(Base):
+    """采集器监听的 Telegram 频道"""
+    
+    __tablename__ = "channels"
+    
+    id: Mapped[str] = mapped_column(String(128), primary_key=True)  # 频道 ID 或用户名
+    name: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)  # 显示名称
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        server_default=text("CURRENT_TIMESTAMP"),
+        nullable=False
+    )
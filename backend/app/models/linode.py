@@ -5,7 +5,7 @@ from datetime import datetime
 from enum import Enum
 from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import DateTime, Float, Index, Integer, String
+from sqlalchemy import DateTime, Enum as SAEnum, Float, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -45,10 +45,10 @@ class Linode(Base, TimestampMixin):
     root_password: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
     
     # 状态管理
-    status: Mapped[str] = mapped_column(
-        String(32),
+    status: Mapped[LinodeStatus] = mapped_column(
+        SAEnum(LinodeStatus, name="linode_status", length=32),
         nullable=False,
-        default=LinodeStatus.PROVISIONING.value
+        default=LinodeStatus.PROVISIONING
     )
     
     # 成本追踪
@@ -59,8 +59,8 @@ class Linode(Base, TimestampMixin):
     ready_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     destroyed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
-    # 关系
-    batches: Mapped[List["Batch"]] = relationship("Batch", back_populates="linode")
+    # 关系 (禁止隐式懒加载，需要时用 selectinload 显式加载)
+    batches: Mapped[List["Batch"]] = relationship("Batch", back_populates="linode", lazy="raise")
     
     __table_args__ = (
         Index("idx_linodes_linode_id", "linode_id", unique=True),
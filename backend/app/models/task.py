@@ -4,9 +4,8 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional, List
-import json
 
-from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import JSON, BigInteger, DateTime, Enum as SAEnum, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -31,22 +30,24 @@ class Task(Base, TimestampMixin):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     
     # 来源信息
-    telegram_msg_id: Mapped[int] = mapped_column(Integer, nullable=False)
-    telegram_chat_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    telegram_msg_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    telegram_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     source_url: Mapped[str] = mapped_column(Text, nullable=False)
     
     # 资源元数据
     title: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # 资源描述文本
-    file_size: Mapped[int] = mapped_column(Integer, default=0)
+    file_size: Mapped[int] = mapped_column(BigInteger, default=0)
     preview_image: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)  # 兼容旧数据
-    preview_images: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON 数组存储多张图片
+    preview_images: Mapped[Optional[List[str]]] = mapped_column(
+        JSON(none_as_null=True), nullable=True
+    )  # 多张预览图 (JSON 数组，读取时由驱动层反序列化)
     
     # 状态管理
-    status: Mapped[str] = mapped_column(
-        String(32), 
+    status: Mapped[TaskStatus] = mapped_column(
+        SAEnum(TaskStatus, name="task_status", length=32),
         nullable=False, 
-        default=TaskStatus.PENDING.value
+        default=TaskStatus.PENDING
     )
     
     # 批次关联
@@ -59,7 +60,9 @@ class Task(Base, TimestampMixin):
     # 下载详情
     pikpak_file_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
     pikpak_file_name: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)  # 用于按名查找
-    aria2_gids: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON 数组存储多个 GID
+    aria2_gids: Mapped[Optional[List[str]]] = mapped_column(
+        JSON(none_as_null=True), nullable=True
+    )  # 多个 Aria2 GID (JSON 数组)
     download_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
@@ -67,47 +70,16 @@ class Task(Base, TimestampMixin):
     confirmed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
-    # 关系
-    batch: Mapped[Optional["Batch"]] = relationship("Batch", back_populates="tasks")
+    # 关系 (禁止隐式懒加载，需要时用 selectinload 显式加载)
+    batch: Mapped[Optional["Batch"]] = relationship("Batch", back_populates="tasks", lazy="raise")
     
     __table_args__ = (
-        Index("idx_tasks_status", "status"),
+        Index("idx_tasks_status_created", "status", "created_at", "id"),  # 按状态的键集分页
+        Index("idx_tasks_created_at", "created_at"),  # 不限状态的历史列表排序
+        Index("idx_tasks_status_completed", "status", "completed_at"),  # 自动清理: 最后完成时间
         Index("idx_tasks_batch_id", "batch_id"),
-        Index("idx_tasks_telegram", "telegram_chat_id", "telegram_msg_id", unique=True),
+        Index("idx_tasks_telegram", "telegram_chat_id", "telegram_msg_id", unique=True),  # 采集器去重键
     )
-    
-    def get_preview_images_list(self) -> List[str]:
-        """获取预览图列表"""
-        images = []
-        # 优先使用新字段
-        if self.preview_images:
-            try:
-                images = json.loads(self.preview_images)
-            except json.JSONDecodeError:
-                pass
-        # 兼容旧数据
-        if not images and self.preview_image:
-            images = [self.preview_image]
-        return images
-    
-    def set_preview_images_list(self, images: List[str]):
-        """设置预览图列表"""
-        self.preview_images = json.dumps(images) if images else None
-        # 同时设置第一张图到旧字段，保持兼容
-        self.preview_image = images[0] if images else None
-    
-    def get_aria2_gids(self) -> List[str]:
-        """获取 Aria2 GID 列表"""
-        if self.aria2_gids:
-            try:
-                return json.loads(self.aria2_gids)
-            except json.JSONDecodeError:
-                return []
-        return []
-    
-    def set_aria2_gids(self, gids: List[str]):
-        """设置 Aria2 GID 列表"""
-        self.aria2_gids = json.dumps(gids) if gids else None
 
 
 # 延迟导入，避免循环引用
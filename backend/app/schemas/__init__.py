@@ -4,7 +4,7 @@ Pydantic 数据模型 (API 请求/响应)
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 # =============================================================================
@@ -27,6 +27,17 @@ class TaskCreate(TaskBase):
     telegram_chat_id: int
 
 
+class TaskBulkCreate(BaseModel):
+    """批量创建任务请求"""
+    tasks: List[TaskCreate] = Field(default_factory=list, max_length=500)
+
+
+class TaskBulkCreateResponse(BaseModel):
+    """批量创建任务响应"""
+    created: int
+    skipped: int
+
+
 class TaskResponse(TaskBase):
     """任务响应"""
     id: int
@@ -34,36 +45,26 @@ class TaskResponse(TaskBase):
     telegram_chat_id: int
     status: str
     batch_id: Optional[int] = None
-    aria2_gids: Optional[str] = None
+    aria2_gids: Optional[List[str]] = None
     error_message: Optional[str] = None
     created_at: datetime
     confirmed_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
     
+    @field_validator("preview_images", mode="before")
     @classmethod
-    def from_task(cls, task) -> "TaskResponse":
-        """从 Task 模型创建响应，处理 preview_images"""
-        return cls(
-            id=task.id,
-            telegram_msg_id=task.telegram_msg_id,
-            telegram_chat_id=task.telegram_chat_id,
-            source_url=task.source_url,
-            title=task.title,
-            description=task.description,
-            file_size=task.file_size,
-            preview_image=task.preview_image,
-            preview_images=task.get_preview_images_list(),
-            status=task.status,
-            batch_id=task.batch_id,
-            aria2_gids=task.aria2_gids,
-            error_message=task.error_message,
-            created_at=task.created_at,
-            confirmed_at=task.confirmed_at,
-            completed_at=task.completed_at
-        )
+    def _default_preview_images(cls, value):
+        """数据库中为 NULL 时返回空列表"""
+        return value or []
+
+    @model_validator(mode="after")
+    def _fallback_preview_image(self) -> "TaskResponse":
+        """旧数据只有单图字段"""
+        if not self.preview_images and self.preview_image:
+            self.preview_images = [self.preview_image]
+        return self
 
 
 class TaskAction(BaseModel):
@@ -74,7 +75,9 @@ class TaskAction(BaseModel):
 class PendingTasksResponse(BaseModel):
     """待处理任务列表响应"""
     tasks: List[TaskResponse]
-    total: int
+    total: Optional[int] = None  # 总数 (仅 include_total=true 时返回)
+    total_capped: bool = False  # 实际数量超过统计上限，total 只计到上限
+    next_cursor: Optional[int] = None  # 下一页游标 (为空表示没有更多)
 
 
 # =============================================================================
@@ -94,8 +97,7 @@ class BatchResponse(BaseModel):
     activated_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # =============================================================================
@@ -118,8 +120,7 @@ class LinodeResponse(BaseModel):
     ready_at: Optional[datetime] = None
     destroyed_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # =============================================================================
@@ -1,9 +1,9 @@
 """
 服务层
 """
-from app.services.aria2_client import Aria2Client, Aria2Error, get_aria2_client
+from app.services.aria2_client import Aria2Client, Aria2Error, get_aria2_client, close_aria2_client
 from app.services.pikpak_service import PikPakService, PikPakError, get_pikpak_service
-from app.services.linode_manager import LinodeManager, LinodeError, get_linode_manager
+from app.services.linode_manager import LinodeManager, LinodeError, get_linode_manager, close_linode_client
 from app.services.orchestrator import Orchestrator, get_orchestrator
 from app.services.proxy_tester import ProxyTester, get_proxy_tester
 
@@ -11,12 +11,14 @@ __all__ = [
     "Aria2Client",
     "Aria2Error",
     "get_aria2_client",
+    "close_aria2_client",
     "PikPakService",
     "PikPakError",
     "get_pikpak_service",
     "LinodeManager",
     "LinodeError",
     "get_linode_manager",
+    "close_linode_client",
     "Orchestrator",
     "get_orchestrator",
     "ProxyTester",
@@ -1,49 +1,127 @@
 """
 Aria2 RPC 客户端
 """
-import json
-import uuid
-from typing import Any, Dict, List, Optional
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
+from websockets.asyncio.client import ClientConnection, connect as ws_connect
 
 from app.core.config import get_settings
 
 
+# 进程内共享的 HTTP 连接池，所有 Aria2Client 实例复用 keep-alive 连接
+# (Aria2 RPC 仅支持 HTTP/1.1，少量长连接即可)
+# 连接池绑定创建时的事件循环，循环变化 (测试、重载) 时重新创建
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# addUri 默认下载选项
+_DEFAULT_URI_OPTIONS = {
+    "user-agent": "Logos-Droid",
+    "split": "16",
+    "max-connection-per-server": "16",
+}
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """获取当前事件循环的共享 HTTP 客户端 (首次调用时创建)"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client_loop = loop
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0),
+            limits=httpx.Limits(
+                max_connections=8,
+                max_keepalive_connections=4,
+                keepalive_expiry=60.0
+            )
+        )
+    return _http_client
+
+
 class Aria2Client:
     """Aria2 JSON-RPC 客户端"""
     
+    # 仪表盘统计查询的超时 (秒)，Aria2 不可用时尽快返回默认值
+    STAT_TIMEOUT = 2.0
+    
     def __init__(self, rpc_url: Optional[str] = None, rpc_secret: Optional[str] = None):
         settings = get_settings()
         self.rpc_url = rpc_url or settings.aria2_rpc_url
         self.rpc_secret = rpc_secret or settings.aria2_rpc_secret
-        self._client = httpx.AsyncClient(timeout=30.0)
+        # JSON-RPC 请求 ID 只需在连接内区分请求，自增计数即可
+        self._ids = itertools.count()
     
-    async def _call(self, method: str, params: Optional[List[Any]] = None) -> Any:
-        """执行 RPC 调用"""
+    async def _call(
+        self,
+        method: str,
+        params: Optional[List[Any]] = None,
+        timeout: Optional[float] = None,
+        with_token: bool = True
+    ) -> Any:
+        """执行 RPC 调用 (timeout 为空时使用客户端默认超时)"""
         # 构造参数列表，首位添加 token
         call_params = []
-        if self.rpc_secret:
+        if with_token and self.rpc_secret:
             call_params.append(f"token:{self.rpc_secret}")
         if params:
             call_params.extend(params)
         
         payload = {
             "jsonrpc": "2.0",
-            "id": str(uuid.uuid4()),
+            "id": next(self._ids),
             "method": method,
             "params": call_params
         }
         
-        response = await self._client.post(self.rpc_url, json=payload)
+        response = await _get_http_client().post(
+            self.rpc_url,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        )
         response.raise_for_status()
         
-        result = response.json()
+        result = orjson.loads(response.content)
         if "error" in result:
             raise Aria2Error(result["error"]["message"], result["error"]["code"])
         
         return result.get("result")
     
+    async def _multicall(self, method: str, params_list: List[List[Any]]) -> List[Any]:
+        """
+        批量调用同一方法 (system.multicall，一次 RPC 往返)
+        
+        Returns:
+            与 params_list 一一对应的结果: 成功为单元素列表，失败为 {code, message}
+        """
+        token = [f"token:{self.rpc_secret}"] if self.rpc_secret else []
+        calls = [
+            {"methodName": method, "params": token + params}
+            for params in params_list
+        ]
+        # system.multicall 不需要 token，每个子调用各自携带
+        return await self._call("system.multicall", [calls], with_token=False)
+    
+    @staticmethod
+    def _add_uri_params(
+        uris: List[str],
+        options: Optional[Dict[str, str]] = None,
+        position: Optional[int] = None
+    ) -> List[Any]:
+        """构造 aria2.addUri 参数 (合并默认下载选项)"""
+        params: List[Any] = [uris, {**_DEFAULT_URI_OPTIONS, **(options or {})}]
+        if position is not None:
+            params.append(position)
+        return params
+    
     async def add_uri(
         self,
         uris: List[str],
@@ -61,22 +139,38 @@ class Aria2Client:
         Returns:
             任务 GID
         """
-        params: List[Any] = [uris]
+        return await self._call("aria2.addUri", self._add_uri_params(uris, options, position))
+    
+    async def multi_add_uri(
+        self,
+        downloads: List[Tuple[List[str], Optional[Dict[str, str]]]]
+    ) -> List[str]:
+        """
+        批量添加下载任务 (system.multicall，一次 RPC 往返)
         
-        # 添加默认选项
-        default_options = {
-            "user-agent": "Logos-Droid",
-            "split": "16",
-            "max-connection-per-server": "16",
-        }
-        if options:
-            default_options.update(options)
-        params.append(default_options)
+        Args:
+            downloads: (uris, options) 列表
+            
+        Returns:
+            与 downloads 一一对应的任务 GID
+            
+        Raises:
+            Aria2Error: 任一子调用失败 (其余子调用可能已添加成功)
+        """
+        if not downloads:
+            return []
         
-        if position is not None:
-            params.append(position)
+        results = await self._multicall(
+            "aria2.addUri",
+            [self._add_uri_params(uris, options) for uris, options in downloads]
+        )
         
-        return await self._call("aria2.addUri", params)
+        gids = []
+        for item in results:
+            if not isinstance(item, list):
+                raise Aria2Error(item.get("message", ""), item.get("code", -1))
+            gids.append(item[0])
+        return gids
     
     async def tell_status(
         self,
@@ -99,6 +193,31 @@ class Aria2Client:
         
         return await self._call("aria2.tellStatus", params)
     
+    async def multi_tell_status(
+        self,
+        gids: List[str],
+        keys: Optional[List[str]] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        批量查询任务状态 (system.multicall，一次 RPC 往返)
+        
+        Args:
+            gids: 任务 GID 列表
+            keys: 要返回的字段列表 (不指定则返回全部)
+            
+        Returns:
+            与 gids 一一对应的状态信息，查询失败 (如 GID 不存在) 的项为 None
+        """
+        if not gids:
+            return []
+        
+        extra = [keys] if keys else []
+        results = await self._multicall(
+            "aria2.tellStatus", [[gid] + extra for gid in gids]
+        )
+        
+        return [item[0] if isinstance(item, list) else None for item in results]
+    
     async def tell_active(self, keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """获取所有活跃的下载任务"""
         params: List[Any] = []
@@ -134,7 +253,7 @@ class Aria2Client:
     
     async def get_global_stat(self) -> Dict[str, Any]:
         """获取全局统计信息 (速度、任务数等)"""
-        return await self._call("aria2.getGlobalStat")
+        return await self._call("aria2.getGlobalStat", timeout=self.STAT_TIMEOUT)
     
     async def pause(self, gid: str) -> str:
         """暂停任务"""
@@ -152,9 +271,42 @@ class Aria2Client:
         """获取 Aria2 版本信息"""
         return await self._call("aria2.getVersion")
     
-    async def close(self):
-        """关闭 HTTP 客户端"""
-        await self._client.aclose()
+    @property
+    def ws_url(self) -> str:
+        """WebSocket RPC 地址 (与 HTTP RPC 同端口同路径)"""
+        if self.rpc_url.startswith("https://"):
+            return "wss://" + self.rpc_url[len("https://"):]
+        if self.rpc_url.startswith("http://"):
+            return "ws://" + self.rpc_url[len("http://"):]
+        return self.rpc_url
+    
+    @asynccontextmanager
+    async def notifications(self) -> AsyncIterator[AsyncIterator[Tuple[str, str]]]:
+        """
+        订阅 Aria2 事件通知 (WebSocket)
+        
+        Aria2 向所有 WebSocket 连接广播 aria2.onDownloadComplete /
+        aria2.onDownloadError 等通知，无需 token。
+        
+        用法:
+            async with client.notifications() as events:
+                async for method, gid in events:
+                    ...
+        
+        连接断开时迭代结束 (正常关闭) 或抛出异常，由调用方负责重连。
+        """
+        async with ws_connect(self.ws_url, ping_interval=20, ping_timeout=20) as ws:
+            yield self._iter_notifications(ws)
+    
+    @staticmethod
+    async def _iter_notifications(ws: ClientConnection) -> AsyncIterator[Tuple[str, str]]:
+        """解析通知消息，产出 (方法名, GID)"""
+        async for message in ws:
+            data = orjson.loads(message)
+            method = data.get("method")
+            params = data.get("params")
+            if method and params:
+                yield method, params[0].get("gid")
 
 
 class Aria2Error(Exception):
@@ -176,3 +328,13 @@ def get_aria2_client() -> Aria2Client:
     if _aria2_client is None:
         _aria2_client = Aria2Client()
     return _aria2_client
+
+
+async def close_aria2_client():
+    """关闭共享的 HTTP 连接池 (应用关闭时调用)"""
+    global _http_client, _http_client_loop
+    # 其他事件循环创建的连接池无法在当前循环中关闭，直接丢弃
+    if _http_client is not None and _http_client_loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
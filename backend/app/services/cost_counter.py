@@ -0,0 +1,77 @@
+"""
+本月费用计数器
+
+按月累计已销毁实例的费用，存放在 Config 表中 (key = monthly_cost:YYYY-MM)，
+仪表盘读取单行即可，无需每次对 Linode 表做 SUM。
+新的月份对应新的 key，无需显式重置。
+"""
+from datetime import datetime
+
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Config, Linode
+
+MONTHLY_COST_KEY_PREFIX = "monthly_cost:"
+
+# 当前月份的计数器 key 缓存，跨月时重新生成
+_current_key = {"month": None, "key": None}
+
+
+def monthly_cost_key(when: datetime) -> str:
+    """返回指定时间所在月份的计数器 key"""
+    return f"{MONTHLY_COST_KEY_PREFIX}{when:%Y-%m}"
+
+
+def current_monthly_cost_key() -> str:
+    """返回当前月份的计数器 key (同一月份内复用同一字符串)"""
+    now = datetime.now()
+    month = (now.year, now.month)
+    if _current_key["month"] != month:
+        _current_key["key"] = monthly_cost_key(now)
+        _current_key["month"] = month
+    return _current_key["key"]
+
+
+def _month_start(when: datetime) -> datetime:
+    """返回指定时间所在月份的第一天零点"""
+    return when.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+async def add_monthly_cost(db: AsyncSession, when: datetime, amount: float):
+    """将费用累加到 when 所在月份的计数器 (不存在时创建)"""
+    if amount <= 0:
+        return
+    stmt = sqlite_insert(Config).values(
+        key=monthly_cost_key(when),
+        value=str(amount),
+        description="本月累计费用 (美元)"
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Config.key],
+        set_={
+            "value": cast(Config.value, Float) + amount,
+            "updated_at": datetime.utcnow()
+        }
+    )
+    await db.execute(stmt)
+
+
+async def seed_monthly_cost(db: AsyncSession, now: datetime):
+    """
+    本月计数器不存在时，用 Linode 表的历史记录初始化
+
+    启动时调用一次，使升级前已销毁的实例费用也计入本月。
+    """
+    month_sum = (
+        select(func.coalesce(func.sum(Linode.total_minutes * Linode.hourly_cost / 60), 0.0))
+        .where(Linode.created_at >= _month_start(now))
+        .scalar_subquery()
+    )
+    stmt = sqlite_insert(Config).values(
+        key=monthly_cost_key(now),
+        value=cast(month_sum, Float),
+        description="本月累计费用 (美元)"
+    ).on_conflict_do_nothing()
+    await db.execute(stmt)
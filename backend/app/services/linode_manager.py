@@ -1,24 +1,143 @@
 """
 Linode 实例管理服务
 """
+import asyncio
+import base64
+import calendar
+import random
 import secrets
 import logging
+import string
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# root 密码的随机字节数 (base64 编码后 32 个字符)
+ROOT_PASSWORD_BYTES = 24
+
+# 进程内共享的 Linode API 连接池，所有 LinodeManager 实例复用 keep-alive 连接
+# (启用 HTTP/2，并发请求在同一 TLS 连接上多路复用)
+# 连接池绑定创建时的事件循环，循环变化 (测试、重载) 时重新创建
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """获取当前事件循环的共享 HTTP 客户端 (首次调用时创建)"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client_loop = loop
+        _http_client = httpx.AsyncClient(
+            base_url=LinodeManager.BASE_URL,
+            headers={"Content-Type": "application/json"},
+            timeout=60.0,
+            # 传输层负责连接失败的重试，HTTP 状态码的重试见 LinodeManager._request
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30.0
+                )
+            )
+        )
+    return _http_client
+
+
+class AdaptiveLimiter:
+    """
+    自适应令牌桶限速器
+    
+    所有请求共享同一个桶：收到 429 时速率减半，连续成功若干次后缓慢回升，
+    使并发批量操作整体退让，而不是每个请求各自盲目重试。
+    """
+    
+    def __init__(
+        self,
+        initial_rps: float = 10.0,
+        min_rps: float = 0.5,
+        max_rps: float = 20.0,
+        grow_after: int = 20
+    ):
+        self.rate = initial_rps
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        self.grow_after = grow_after
+        self._tokens = 1.0
+        self._updated_at = time.monotonic()
+        self._successes = 0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """获取一个令牌 (令牌不足时等待补充)"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                # 桶容量至少为 1，低速率时仍能取到令牌
+                capacity = max(1.0, self.rate)
+                self._tokens = min(capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+    
+    def record(self, status_code: int):
+        """根据响应状态调整速率"""
+        if status_code == 429:
+            self._successes = 0
+            self.shrink(0.5)
+        elif status_code < 400:
+            self._successes += 1
+            if self._successes >= self.grow_after:
+                self._successes = 0
+                self.grow(1.1)
+    
+    def shrink(self, factor: float):
+        self.rate = max(self.min_rps, self.rate * factor)
+    
+    def grow(self, factor: float):
+        self.rate = min(self.max_rps, self.rate * factor)
+
 
 class LinodeManager:
     """Linode API 管理器"""
     
     BASE_URL = "https://api.linode.com/v4"
     
+    # 批量创建/删除时的最大并发请求数 (避免触发 API 限流)
+    BATCH_CONCURRENCY = 16
+    
+    # 实例列表每页数量 (API 允许的最大值)
+    PAGE_SIZE = 500
+    
+    # 完整实例列表的缓存有效期 (秒)
+    LIST_CACHE_TTL = 5.0
+    
+    # 标签 -> 实例映射的缓存有效期 (秒)
+    LABEL_CACHE_TTL = 30.0
+    
+    # 本月预计费用的缓存有效期 (秒)
+    COST_CACHE_TTL = 300.0
+    
+    # 限流 / 服务端错误的重试策略 (指数退避 + 完全抖动)
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+    MAX_RETRIES = 4
+    RETRY_BASE_DELAY = 1.0
+    RETRY_MAX_DELAY = 30.0
+    
     # 双代理 cloud-init 脚本模板 (SOCKS5: Dante + HTTP: Tinyproxy)
+    # string.Template 语法: ${name} 为占位符，shell 中的 $ 需写作 $$
     CLOUD_INIT_TEMPLATE = """#cloud-config
 packages:
   - dante-server
@@ -28,15 +147,15 @@ packages:
 runcmd:
   # 获取主网卡名称
   - |
-    IFACE=$(ip route | grep default | awk '{{print $5}}' | head -1)
+    IFACE=$$(ip route | grep default | awk '{print $$5}' | head -1)
     
     # ===== SOCKS5 代理 (Dante) =====
     # 写入 Dante 配置文件
     cat > /etc/danted.conf <<EOF
     logoutput: syslog
     
-    internal: 0.0.0.0 port = {port}
-    external: $IFACE
+    internal: 0.0.0.0 port = ${port}
+    external: $$IFACE
     
     socksmethod: username
     clientmethod: none
@@ -44,18 +163,18 @@ runcmd:
     user.privileged: root
     user.unprivileged: nobody
     
-    client pass {{
+    client pass {
         from: 0.0.0.0/0 to: 0.0.0.0/0
         log: error
-    }}
+    }
     
-    socks pass {{
+    socks pass {
         from: 0.0.0.0/0 to: 0.0.0.0/0
         protocol: tcp udp
         command: bind connect udpassociate
         log: error
         socksmethod: username
-    }}
+    }
     EOF
     
     # ===== HTTP 代理 (Tinyproxy) =====
@@ -63,7 +182,7 @@ runcmd:
     cat > /etc/tinyproxy/tinyproxy.conf <<EOF
     User tinyproxy
     Group tinyproxy
-    Port {http_port}
+    Port ${http_port}
     Timeout 600
     DefaultErrorFile "/usr/share/tinyproxy/default.html"
     StatFile "/usr/share/tinyproxy/stats.html"
@@ -80,12 +199,12 @@ runcmd:
     DisableViaHeader No
     
     # 基础认证 (使用 htpasswd)
-    BasicAuth {username} {password}
+    BasicAuth ${username} ${password}
     EOF
     
   # 创建代理认证用户
-  - useradd -r -s /bin/false {username} || true
-  - echo "{username}:{password}" | chpasswd
+  - useradd -r -s /bin/false ${username} || true
+  - echo "${username}:${password}" | chpasswd
   
   # 启动服务
   - systemctl enable danted
@@ -94,27 +213,97 @@ runcmd:
   - systemctl start tinyproxy
   
   # 配置防火墙
-  - ufw allow {port}/tcp
-  - ufw allow {http_port}/tcp
+  - ufw allow ${port}/tcp
+  - ufw allow ${http_port}/tcp
   - ufw --force enable
   
   # 标记就绪
   - touch /var/run/proxy_ready
 """
     
+    _CLOUD_INIT = string.Template(CLOUD_INIT_TEMPLATE)
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _build_user_data(port: int, http_port: int, username: str, password: str) -> str:
+        """
+        生成 base64 编码的 cloud-init 脚本 (Linode API 要求 user_data 为 base64)
+        
+        相同的代理参数直接复用上次结果，无需重复渲染与编码。
+        """
+        user_data = LinodeManager._CLOUD_INIT.substitute(
+            port=port,
+            http_port=http_port,
+            username=username,
+            password=password
+        )
+        return base64.b64encode(user_data.encode("utf-8")).decode("ascii")
+    
     def __init__(self, token: Optional[str] = None):
         settings = get_settings()
         self.token = token or settings.linode_token
         self.region = settings.linode_region
         self.instance_type = settings.linode_type
-        self._client = httpx.AsyncClient(
-            base_url=self.BASE_URL,
-            headers={
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            },
-            timeout=60.0
-        )
+        # 令牌按实例区分，随每个请求发送
+        self._headers = {"Authorization": f"Bearer {self.token}"}
+        # 最近一次完整实例列表: (获取时间, 列表)
+        self._list_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+        self._list_inflight: Optional[asyncio.Future] = None  # 进行中的完整列表拉取
+        # 最近一次实例列表按标签建立的索引 (创建/删除实例后失效)
+        self._label_cache: Dict[str, Dict[str, Any]] = {}
+        self._label_cache_at = 0.0
+        # 缓存代数: 每次失效加一，拉取期间代数变化时结果不写入缓存
+        self._cache_generation = 0
+        # 本月预计费用缓存: (计算时间, 费用)
+        self._cost_cache: Optional[Tuple[float, float]] = None
+        # 该令牌下所有请求共享的自适应限速
+        self._limiter = AdaptiveLimiter(initial_rps=10.0)
+    
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return _get_http_client()
+    
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        发送 API 请求 (经过自适应限速)，遇到 429/5xx 时退避重试
+        
+        优先遵循 Retry-After 头，否则等待 [0, min(上限, 基数 * 2^重试次数)) 内的随机时长；
+        重试耗尽后返回最后一次响应，由调用方决定如何处理。
+        POST 不是幂等的 (5xx 时实例可能已创建)，只在 429 时重试。
+        """
+        retry_codes = self.RETRY_STATUS_CODES if method != "POST" else {429}
+        if headers:
+            headers = {**self._headers, **headers}
+        else:
+            headers = self._headers
+        for attempt in range(self.MAX_RETRIES + 1):
+            await self._limiter.acquire()
+            response = await self._client.request(
+                method, url, headers=headers, **kwargs
+            )
+            self._limiter.record(response.status_code)
+            if response.status_code not in retry_codes or attempt == self.MAX_RETRIES:
+                return response
+            
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(float(retry_after), self.RETRY_MAX_DELAY)
+            else:
+                delay = random.uniform(
+                    0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt)
+                )
+            logger.warning(
+                f"Linode API {method} {url} 返回 {response.status_code}，"
+                f"{delay:.1f}s 后重试 ({attempt + 1}/{self.MAX_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+        return response
     
     async def create_instance(
         self,
@@ -135,40 +324,138 @@ runcmd:
         Returns:
             实例信息 (包含 id, ip_address, socks5_* 等)
         """
-        settings = get_settings()
+        socks5_port, socks5_username, socks5_password = self._proxy_credentials(
+            socks5_port, socks5_username, socks5_password
+        )
         
-        # 使用配置中的固定值作为默认
-        socks5_port = socks5_port or settings.socks5_port
-        socks5_username = socks5_username or settings.socks5_username
-        socks5_password = socks5_password or settings.socks5_password
+        # 幂等性检查：先尝试查找同名标签的现有实例
+        existing = (await self._label_map()).get(label)
+        if existing is not None:
+            logger.info(f"发现已存在的同名实例: {label} (ID: {existing['id']})，将复用该实例")
+            return self._with_credentials(
+                dict(existing), socks5_port, socks5_username, socks5_password
+            )
         
-        # HTTP 代理端口 = SOCKS5 端口 + 7000
-        http_port = socks5_port + 7000
+        # 生成 cloud-init 脚本 (HTTP 代理端口 = SOCKS5 端口 + 7000)
+        user_data_b64 = self._build_user_data(
+            socks5_port, socks5_port + 7000, socks5_username, socks5_password
+        )
         
-        # 生成 cloud-init 脚本
-        user_data = self.CLOUD_INIT_TEMPLATE.format(
-            port=socks5_port,
-            http_port=http_port,
-            username=socks5_username,
-            password=socks5_password
+        data = await self._post_create(label, user_data_b64)
+        return self._with_credentials(data, socks5_port, socks5_username, socks5_password)
+    
+    async def create_instances(
+        self,
+        labels: List[str],
+        socks5_port: Optional[int] = None,
+        socks5_username: Optional[str] = None,
+        socks5_password: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量创建使用相同代理配置的实例 (并发请求)
+        
+        Args:
+            labels: 实例标签列表
+            socks5_port / socks5_username / socks5_password: 同 create_instance
+            
+        Returns:
+            成功创建或复用的实例信息 (创建失败的实例记录日志后跳过)
+        """
+        socks5_port, socks5_username, socks5_password = self._proxy_credentials(
+            socks5_port, socks5_username, socks5_password
         )
         
-        # 幂等性检查：先尝试查找同名标签的现有实例
-        existing_instances = await self.list_instances(label_prefix=label)
-        for inst in existing_instances:
-            if inst.get("label") == label:
-                logger.info(f"发现已存在的同名实例: {label} (ID: {inst['id']})，将复用该实例")
-                inst["socks5_port"] = socks5_port
-                inst["socks5_username"] = socks5_username
-                inst["socks5_password"] = socks5_password
-                return inst
-
-        # 生成 root 密码
-        root_pass = secrets.token_urlsafe(24)
+        # 同一配置只渲染一次 cloud-init 脚本
+        user_data_b64 = self._build_user_data(
+            socks5_port, socks5_port + 7000, socks5_username, socks5_password
+        )
+        
+        label_map = await self._label_map()
+        semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
         
-        # Linode API 要求 user_data 必须是 base64 编码的
-        import base64
-        user_data_b64 = base64.b64encode(user_data.encode("utf-8")).decode("utf-8")
+        # 需要新建的实例一次性生成全部 root 密码
+        new_labels = [label for label in labels if label not in label_map]
+        root_passwords = dict(zip(new_labels, self._generate_root_passwords(len(new_labels))))
+        
+        async def create_one(label: str) -> Dict[str, Any]:
+            existing = label_map.get(label)
+            if existing is not None:
+                logger.info(f"发现已存在的同名实例: {label} (ID: {existing['id']})，将复用该实例")
+                return dict(existing)
+            async with semaphore:
+                return await self._post_create(label, user_data_b64, root_passwords[label])
+        
+        results = await asyncio.gather(
+            *(create_one(label) for label in labels),
+            return_exceptions=True
+        )
+        
+        instances = []
+        for label, result in zip(labels, results):
+            if isinstance(result, Exception):
+                logger.error(f"创建实例 {label} 失败: {result}")
+                continue
+            instances.append(
+                self._with_credentials(result, socks5_port, socks5_username, socks5_password)
+            )
+        return instances
+    
+    @staticmethod
+    def _proxy_credentials(
+        port: Optional[int],
+        username: Optional[str],
+        password: Optional[str]
+    ) -> Tuple[int, str, str]:
+        """代理参数未指定时使用配置中的固定值"""
+        settings = get_settings()
+        return (
+            port or settings.socks5_port,
+            username or settings.socks5_username,
+            password or settings.socks5_password
+        )
+    
+    @staticmethod
+    def _with_credentials(
+        instance: Dict[str, Any],
+        port: int,
+        username: str,
+        password: str
+    ) -> Dict[str, Any]:
+        """附加返回代理信息"""
+        instance["socks5_port"] = port
+        instance["socks5_username"] = username
+        instance["socks5_password"] = password
+        return instance
+    
+    @staticmethod
+    def _generate_root_passwords(count: int) -> List[str]:
+        """
+        批量生成 root 密码 (与 secrets.token_urlsafe(24) 等价)
+        
+        一次读取全部随机字节再切分，避免逐个密码调用 os.urandom。
+        """
+        raw = secrets.token_bytes(ROOT_PASSWORD_BYTES * count)
+        return [
+            base64.urlsafe_b64encode(
+                raw[i * ROOT_PASSWORD_BYTES:(i + 1) * ROOT_PASSWORD_BYTES]
+            ).rstrip(b"=").decode("ascii")
+            for i in range(count)
+        ]
+    
+    async def _post_create(
+        self,
+        label: str,
+        user_data_b64: str,
+        root_pass: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        调用 API 创建实例
+        
+        Returns:
+            API 返回的实例信息，附加 root_pass (系统凭据)
+        """
+        # 生成 root 密码
+        root_pass = root_pass or secrets.token_urlsafe(ROOT_PASSWORD_BYTES)
         
         payload = {
             "type": self.instance_type,
@@ -181,20 +468,18 @@ runcmd:
             }
         }
         
-        response = await self._client.post("/linode/instances", json=payload)
-        if response.status_code != 200:
-            error_details = response.json()
-            logger.error(f"Linode API Error (400): {error_details}")
-        response.raise_for_status()
-        
-        data = response.json()
+        response = await self._request(
+            "POST", "/linode/instances", content=orjson.dumps(payload)
+        )
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Linode API Error ({e.response.status_code}): {e.response.text}")
+            raise
+        self._invalidate_caches()
         
-        # 附加返回代理信息和系统凭据
-        data["socks5_port"] = socks5_port
-        data["socks5_username"] = socks5_username
-        data["socks5_password"] = socks5_password
+        data = orjson.loads(response.content)
         data["root_pass"] = root_pass
-        
         return data
     
     async def get_instance(self, linode_id: int) -> Dict[str, Any]:
@@ -207,30 +492,95 @@ runcmd:
         Returns:
             实例信息
         """
-        response = await self._client.get(f"/linode/instances/{linode_id}")
+        response = await self._request("GET", f"/linode/instances/{linode_id}")
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     
-    async def list_instances(self, label_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def list_instances(
+        self,
+        label_prefix: Optional[str] = None,
+        force_refresh: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         列出所有实例
         
+        完整列表缓存 LIST_CACHE_TTL 秒，期间的查询 (含按前缀过滤) 直接使用缓存；
+        缓存失效时并发的完整列表查询共享同一次 API 拉取。
+        
         Args:
             label_prefix: 按标签前缀过滤
+            force_refresh: 忽略缓存，强制请求 API
             
         Returns:
             实例列表
         """
-        response = await self._client.get("/linode/instances")
-        response.raise_for_status()
+        if (
+            not force_refresh
+            and self._list_cache is not None
+            and time.monotonic() - self._list_cache[0] < self.LIST_CACHE_TTL
+        ):
+            cached = self._list_cache[1]
+            if label_prefix:
+                return [i for i in cached if i.get("label", "").startswith(label_prefix)]
+            return list(cached)
         
-        instances = response.json().get("data", [])
+        if label_prefix or force_refresh:
+            return await self._fetch_instances(label_prefix)
         
+        # 缓存失效时并发的完整列表查询合并为一次 API 拉取 (如启动时多个调用方同时查询)
+        if self._list_inflight is None:
+            future = asyncio.ensure_future(self._fetch_instances())
+            future.add_done_callback(self._clear_list_inflight)
+            self._list_inflight = future
+        # shield: 单个调用方被取消时不影响其他等待者
+        return list(await asyncio.shield(self._list_inflight))
+    
+    def _clear_list_inflight(self, future: "asyncio.Future"):
+        """共享的列表拉取结束后清除引用 (失效后已被替换的不处理)"""
+        if self._list_inflight is future:
+            self._list_inflight = None
+    
+    async def _fetch_instances(self, label_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """分页拉取实例列表，完整列表同时刷新缓存"""
+        instances: List[Dict[str, Any]] = []
+        label_cache: Dict[str, Dict[str, Any]] = {}
+        generation = self._cache_generation
+        
+        # 有前缀时由 API 端按标签过滤 (X-Filter 只支持包含匹配，本地再校验前缀)
+        headers = None
         if label_prefix:
-            instances = [
-                i for i in instances 
-                if i.get("label", "").startswith(label_prefix)
-            ]
+            headers = {"X-Filter": orjson.dumps({"label": {"+contains": label_prefix}}).decode()}
+        
+        # API 分页返回，逐页读取
+        page = 1
+        while True:
+            response = await self._request(
+                "GET", "/linode/instances",
+                headers=headers,
+                params={"page": page, "page_size": self.PAGE_SIZE}
+            )
+            response.raise_for_status()
+            body = orjson.loads(response.content)
+            
+            for instance in body.get("data", []):
+                label = instance.get("label", "")
+                if not label_prefix:
+                    label_cache[label] = instance
+                    instances.append(instance)
+                elif label.startswith(label_prefix):
+                    instances.append(instance)
+            
+            if page >= body.get("pages", 1):
+                break
+            page += 1
+        
+        # 完整列表顺带刷新缓存与标签索引 (过滤后的结果不完整，不用于缓存；
+        # 拉取期间发生过实例增删时，结果可能已过时，同样不写入)
+        if not label_prefix and generation == self._cache_generation:
+            now = time.monotonic()
+            self._list_cache = (now, instances)
+            self._label_cache = label_cache
+            self._label_cache_at = now
         
         return instances
     
@@ -244,11 +594,24 @@ runcmd:
         Returns:
             实例信息或 None
         """
-        instances = await self.list_instances()
-        for instance in instances:
-            if instance.get("label") == label:
-                return instance
-        return None
+        return (await self._label_map()).get(label)
+    
+    async def _label_map(self) -> Dict[str, Dict[str, Any]]:
+        """返回标签 -> 实例映射 (缓存过期时重新拉取实例列表)"""
+        if time.monotonic() - self._label_cache_at > self.LABEL_CACHE_TTL:
+            instances = await self.list_instances()
+            if time.monotonic() - self._label_cache_at > self.LABEL_CACHE_TTL:
+                # 拉取期间缓存被失效，结果未写入缓存，仅用于本次查询
+                return {instance.get("label", ""): instance for instance in instances}
+        return self._label_cache
+    
+    def _invalidate_caches(self):
+        """实例增删后使实例列表缓存与标签索引失效"""
+        self._list_cache = None
+        self._label_cache_at = 0.0
+        self._cache_generation += 1
+        # 失效前发起的拉取可能包含旧数据，之后的查询不再复用
+        self._list_inflight = None
     
     async def delete_instance(self, linode_id: int) -> bool:
         """
@@ -260,7 +623,8 @@ runcmd:
         Returns:
             是否成功
         """
-        response = await self._client.delete(f"/linode/instances/{linode_id}")
+        response = await self._request("DELETE", f"/linode/instances/{linode_id}")
+        self._invalidate_caches()
         return response.status_code == 200
     
     async def wait_for_running(
@@ -280,24 +644,57 @@ runcmd:
         Returns:
             公网 IP 地址或 None (超时)
         """
-        import asyncio
+        ready = await self.wait_for_running_many(
+            [linode_id], timeout_seconds, poll_interval
+        )
+        return ready.get(linode_id)
+    
+    async def wait_for_running_many(
+        self,
+        linode_ids: List[int],
+        timeout_seconds: int = 300,
+        poll_interval: int = 10
+    ) -> Dict[int, str]:
+        """
+        等待多个实例进入 running 状态
         
-        start_time = datetime.now()
-        while True:
-            elapsed = (datetime.now() - start_time).total_seconds()
-            if elapsed > timeout_seconds:
-                return None
-            
-            instance = await self.get_instance(linode_id)
-            status = instance.get("status")
+        每轮只请求一次实例列表，在本地筛选各实例状态，
+        API 调用次数与实例数量无关。
+        
+        Args:
+            linode_ids: Linode 实例 ID 列表
+            timeout_seconds: 超时时间 (秒)
+            poll_interval: 轮询间隔 (秒)
             
-            if status == "running":
+        Returns:
+            已就绪实例的 ID -> 公网 IP 映射 (超时或已不存在的实例不包含在内)
+        """
+        pending = set(linode_ids)
+        ready: Dict[int, str] = {}
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        while pending and loop.time() < deadline:
+            instances = {
+                i["id"]: i for i in await self.list_instances(force_refresh=True)
+            }
+            for linode_id in list(pending):
+                instance = instances.get(linode_id)
+                if instance is None:
+                    logger.warning(f"实例 {linode_id} 不存在，停止等待")
+                    pending.discard(linode_id)
+                    continue
+                
                 # 获取公网 IPv4
                 ipv4 = instance.get("ipv4", [])
-                if ipv4:
-                    return ipv4[0]
+                if instance.get("status") == "running" and ipv4:
+                    ready[linode_id] = ipv4[0]
+                    pending.discard(linode_id)
             
-            await asyncio.sleep(poll_interval)
+            if pending:
+                await asyncio.sleep(poll_interval)
+        
+        return ready
     
     async def delete_all_instances(self, label_prefix: str = "swipe-") -> int:
         """
@@ -309,30 +706,53 @@ runcmd:
         Returns:
             删除的实例数量
         """
-        instances = await self.list_instances(label_prefix)
-        deleted_count = 0
+        instances = await self.list_instances(label_prefix, force_refresh=True)
+        semaphore = asyncio.Semaphore(self.BATCH_CONCURRENCY)
         
-        for instance in instances:
-            linode_id = instance["id"]
-            if await self.delete_instance(linode_id):
+        async def delete_one(linode_id: int) -> bool:
+            async with semaphore:
+                return await self.delete_instance(linode_id)
+        
+        # 并发删除，单个实例失败不影响其他实例
+        results = await asyncio.gather(
+            *(delete_one(instance["id"]) for instance in instances),
+            return_exceptions=True
+        )
+        
+        deleted_count = 0
+        for instance, result in zip(instances, results):
+            if isinstance(result, Exception):
+                logger.error(f"删除实例 {instance['id']} 失败: {result}")
+            elif result:
                 deleted_count += 1
         
         return deleted_count
     
-    async def get_monthly_cost(self) -> float:
+    async def get_monthly_cost(
+        self,
+        instances: Optional[List[Dict[str, Any]]] = None
+    ) -> float:
         """
-        获取本月预计费用
+        获取本月预计费用 (结果缓存 COST_CACHE_TTL 秒)
         
+        Args:
+            instances: 调用方已获取的实例列表 (传入时不再请求 API)
+            
         Returns:
             费用 (USD)
         """
-        # 使用账户接口获取账单信息
-        response = await self._client.get("/account/invoices")
-        if response.status_code != 200:
-            return 0.0
+        now_ts = time.monotonic()
+        if (
+            instances is None
+            and self._cost_cache is not None
+            and now_ts - self._cost_cache[0] < self.COST_CACHE_TTL
+        ):
+            return self._cost_cache[1]
+        
+        if instances is None:
+            instances = await self.list_instances()
         
         # 简化处理：累加所有活跃实例的小时费用
-        instances = await self.list_instances()
         total_hourly = sum(
             i.get("type", {}).get("price", {}).get("hourly", 0)
             for i in instances
@@ -340,14 +760,12 @@ runcmd:
         
         # 粗略估算本月费用 (假设运行至月底)
         now = datetime.now()
-        days_in_month = 30
+        days_in_month = calendar.monthrange(now.year, now.month)[1]
         hours_remaining = (days_in_month - now.day) * 24 + (24 - now.hour)
         
-        return total_hourly * hours_remaining
-    
-    async def close(self):
-        """关闭 HTTP 客户端"""
-        await self._client.aclose()
+        cost = total_hourly * hours_remaining
+        self._cost_cache = (now_ts, cost)
+        return cost
 
 
 class LinodeError(Exception):
@@ -355,13 +773,29 @@ class LinodeError(Exception):
     pass
 
 
-# 单例管理器
+# 单例管理器 (限速器等异步原语绑定事件循环，随循环一起重建)
 _linode_manager: Optional[LinodeManager] = None
+_linode_manager_loop: Optional[asyncio.AbstractEventLoop] = None
 
 
 def get_linode_manager() -> LinodeManager:
-    """获取 Linode 管理器单例"""
-    global _linode_manager
-    if _linode_manager is None:
+    """获取当前事件循环的 Linode 管理器单例"""
+    global _linode_manager, _linode_manager_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _linode_manager is None or (loop is not None and _linode_manager_loop is not loop):
         _linode_manager = LinodeManager()
+        _linode_manager_loop = loop
     return _linode_manager
+
+
+async def close_linode_client():
+    """关闭共享的 HTTP 连接池 (应用关闭时调用)"""
+    global _http_client, _http_client_loop
+    # 其他事件循环创建的连接池无法在当前循环中关闭，直接丢弃
+    if _http_client is not None and _http_client_loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
@@ -11,33 +11,119 @@
 """
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import quote
 
-from sqlalchemy import select, func, update
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Integer, case, cast, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.core.config import get_settings
 from app.core.database import get_db_context
 from app.models import Task, TaskStatus, Linode, LinodeStatus
 from app.services.aria2_client import get_aria2_client
+from app.services.cost_counter import add_monthly_cost
 from app.services.linode_manager import get_linode_manager
 from app.services.pikpak_service import get_pikpak_service
+from app.services.proxy_tester import wait_for_port
 
 logger = logging.getLogger(__name__)
 
+# 仍在处理中的任务状态 (存在这些任务时不销毁实例)
+_ACTIVE_STATUSES = (
+    TaskStatus.CONFIRMED,
+    TaskStatus.PIKPAK_TRANSFERRING,
+    TaskStatus.DOWNLOADING,
+)
+
+# 固定实例标签
+SWIPE_INSTANCE_LABEL = "swipe"
+
+# 定时循环中的固定查询，构造一次后复用 (语句对象的编译缓存键只计算一次)
+_CONFIRMED_TASKS_STMT = select(Task).where(
+    Task.status == TaskStatus.CONFIRMED
+).order_by(Task.id)
+_TRANSFERRING_TASKS_STMT = select(Task).where(
+    Task.status == TaskStatus.PIKPAK_TRANSFERRING
+)
+_DOWNLOADING_TASKS_STMT = select(Task.id, Task.aria2_gids).where(
+    Task.status == TaskStatus.DOWNLOADING
+)
+# 活跃任务数与最后完成时间
+_CLEANUP_STATS_STMT = select(
+    select(func.count()).select_from(Task).where(
+        Task.status.in_(_ACTIVE_STATUSES)
+    ).scalar_subquery(),
+    select(func.max(Task.completed_at)).where(
+        Task.status == TaskStatus.COMPLETE
+    ).scalar_subquery(),
+)
+_LIVE_SWIPE_LINODE_STMT = select(Linode.linode_id, Linode.created_at).where(
+    Linode.label == SWIPE_INSTANCE_LABEL,
+    Linode.status.in_([
+        LinodeStatus.PROVISIONING,
+        LinodeStatus.RUNNING
+    ])
+)
+_RUNNING_PROXY_STMT = select(
+    Linode.ip_address,
+    Linode.socks5_port,
+    Linode.socks5_username,
+    Linode.socks5_password
+).where(
+    Linode.label == SWIPE_INSTANCE_LABEL,
+    Linode.status == LinodeStatus.RUNNING
+)
+_TASK_STATUS_COUNTS_STMT = select(Task.status, func.count()).group_by(Task.status)
+# 状态统计的初始值 (没有任务的状态计为 0)
+_TASK_STATUS_VALUES = tuple(status.value for status in TaskStatus)
+
+# 需要重新检查下载状态的 Aria2 通知
+_DOWNLOAD_FINISHED_EVENTS = frozenset({
+    "aria2.onDownloadComplete",
+    "aria2.onBtDownloadComplete",
+    "aria2.onDownloadError",
+    "aria2.onDownloadStop",
+})
+
 
 class Orchestrator:
     """状态机驱动的编排引擎"""
     
     # 固定实例标签
-    SWIPE_INSTANCE_LABEL = "swipe"
+    SWIPE_INSTANCE_LABEL = SWIPE_INSTANCE_LABEL
+    
+    # 实例就绪后等待代理服务监听的最长时间 (秒)
+    PROXY_READY_TIMEOUT = 180
+    
+    # 下载监控轮询间隔 (秒): 未订阅 Aria2 通知时定时轮询，订阅后仅作兜底
+    MONITOR_POLL_INTERVAL = 30
+    MONITOR_SAFETY_INTERVAL = 300
+    # Aria2 通知连接断开后的最长重连间隔 (秒)
+    NOTIFY_RECONNECT_MAX = 60
+    # 已知没有任务的阶段跳过扫描，最长隔这么久仍重新扫描一次 (秒)
+    IDLE_RESCAN_INTERVAL = 300
     
     def __init__(self):
         self.settings = get_settings()
+        # 单例依赖只解析一次 (编排器在事件循环内创建，与 Linode 管理器绑定同一循环)
+        self.linode_manager = get_linode_manager()
+        self.aria2_client = get_aria2_client()
+        self.pikpak_service = get_pikpak_service()
+        # 每轮按确认顺序最多取 confirm_batch_size 个任务，限制单轮工作量
+        self._confirmed_tasks_stmt = _CONFIRMED_TASKS_STMT.limit(self.settings.confirm_batch_size)
         self._running = False
-        self._instance_creating = False  # 内存锁，防止重复创建实例
+        self._create_task: Optional[asyncio.Task] = None  # 进行中的实例创建，防止重复创建
         self._tasks: List[asyncio.Task] = []
+        # 唤醒事件: 生产者直接通知，循环无需等满轮询间隔
+        self._new_task_event = asyncio.Event()   # 有新的 CONFIRMED 任务 / 实例就绪
+        self._transfer_event = asyncio.Event()   # 有任务进入 PikPak 转存状态
+        self._download_event = asyncio.Event()   # Aria2 通知有下载结束
+        self._notifications_active = False       # Aria2 通知连接是否可用
+        # 任务状态 -> 最近一次结果为空的扫描开始时间 / 最近一次有任务进入的时间
+        self._empty_scanned_at: Dict[TaskStatus, float] = {}
+        self._pending_at: Dict[TaskStatus, float] = {}
     
     async def start(self):
         """启动编排引擎"""
@@ -51,20 +137,24 @@ class Orchestrator:
         # 启动时同步实例状态
         await self._sync_instance_status()
         
-        # 启动 4 个独立定时任务
+        # 启动 4 个独立定时任务，并订阅 Aria2 下载事件
         self._tasks = [
-            asyncio.create_task(self._confirm_and_provision_loop()),  # 确认转存 (30s)
-            asyncio.create_task(self._push_to_aria2_loop()),          # Aria2 推送 (30s)
-            asyncio.create_task(self._monitor_downloads_loop()),       # 下载监控 (30s)
-            asyncio.create_task(self._auto_cleanup_loop()),            # 自动清理 (60s)
+            self._spawn(self._confirm_and_provision_loop()),  # 确认转存 (事件唤醒，最长 30s)
+            self._spawn(self._push_to_aria2_loop()),          # Aria2 推送 (事件唤醒，最长 30s)
+            self._spawn(self._monitor_downloads_loop()),       # 下载监控 (30s)
+            self._spawn(self._auto_cleanup_loop()),            # 自动清理 (60s)
+            self._spawn(self._aria2_notification_loop()),      # Aria2 下载事件订阅
         ]
         
-        logger.info("4 个定时任务已启动")
+        logger.info("4 个定时任务与 Aria2 事件订阅已启动")
     
     async def stop(self):
         """停止编排引擎"""
         self._running = False
         
+        if self._instance_creating:
+            self._tasks.append(self._create_task)
+        
         for task in self._tasks:
             task.cancel()
             try:
@@ -75,6 +165,56 @@ class Orchestrator:
         self._tasks.clear()
         logger.info("编排引擎已停止")
     
+    def _spawn(self, coro) -> asyncio.Task:
+        """创建后台任务，任务异常退出时记录日志 (避免异常随任务对象一起被静默丢弃)"""
+        task = asyncio.create_task(coro, name=f"orchestrator.{coro.__name__}")
+        task.add_done_callback(self._on_task_done)
+        return task
+    
+    @staticmethod
+    def _on_task_done(task: asyncio.Task):
+        """后台任务结束回调"""
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error(f"后台任务 {task.get_name()} 异常退出: {exc!r}", exc_info=exc)
+    
+    @property
+    def _instance_creating(self) -> bool:
+        """是否有进行中的实例创建"""
+        return self._create_task is not None and not self._create_task.done()
+    
+    def notify_new_task(self):
+        """通知编排引擎有新确认的任务，立即唤醒确认转存循环"""
+        self._mark_pending(TaskStatus.CONFIRMED)
+        self._new_task_event.set()
+    
+    def _known_empty(self, status: TaskStatus) -> bool:
+        """该状态上次扫描为空且之后没有任务进入，可跳过本轮扫描 (不打开数据库会话)"""
+        scanned_at = self._empty_scanned_at.get(status)
+        if scanned_at is None or time.monotonic() - scanned_at >= self.IDLE_RESCAN_INTERVAL:
+            return False
+        # 扫描进行期间有任务进入时，扫描结果已过时
+        return self._pending_at.get(status, float("-inf")) < scanned_at
+    
+    def _mark_empty(self, status: TaskStatus, scanned_at: float):
+        """记录该状态在 scanned_at 开始的扫描中没有任务"""
+        self._empty_scanned_at[status] = scanned_at
+    
+    def _mark_pending(self, status: TaskStatus):
+        """有任务进入该状态，下一轮必须扫描"""
+        self._pending_at[status] = time.monotonic()
+    
+    @staticmethod
+    async def _wait_event(event: asyncio.Event, timeout: float):
+        """等待事件触发，最长等待 timeout 秒 (超时后照常执行一轮兜底检查)"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        event.clear()
+    
     # =========================================================================
     # 启动时恢复逻辑
     # =========================================================================
@@ -83,11 +223,9 @@ class Orchestrator:
         """系统启动时同步 swipe 实例状态"""
         logger.info("同步 swipe 实例状态...")
         
-        linode_manager = get_linode_manager()
-        
         try:
             # 检查远程是否存在 swipe 实例
-            remote_instance = await linode_manager.get_instance_by_label(
+            remote_instance = await self.linode_manager.get_instance_by_label(
                 self.SWIPE_INSTANCE_LABEL
             )
             
@@ -101,63 +239,65 @@ class Orchestrator:
                     f"状态={status}, IP={ip_address}"
                 )
                 
-                # 同步到本地数据库
+                # 同步到本地数据库: 一条 INSERT ... ON CONFLICT 完成 "查找或创建"
                 async with get_db_context() as db:
-                    # 查找或创建本地记录
-                    stmt = select(Linode).where(Linode.linode_id == linode_id)
-                    result = await db.execute(stmt)
-                    local_linode = result.scalar_one_or_none()
-                    
-                    settings = get_settings()
-                    
-                    if local_linode is None:
-                        # 远程存在但本地无记录，创建记录 (使用配置中的固定 SOCKS5 凭据)
-                        local_linode = Linode(
-                            linode_id=linode_id,
-                            label=self.SWIPE_INSTANCE_LABEL,
-                            region=remote_instance.get("region", "unknown"),
-                            ip_address=ip_address,
-                            status=LinodeStatus.RUNNING.value if status == "running" else LinodeStatus.PROVISIONING.value,
-                            socks5_port=settings.socks5_port,
-                            socks5_username=settings.socks5_username,
-                            socks5_password=settings.socks5_password,
-                        )
-                        db.add(local_linode)
-                        logger.info(f"已创建本地 Linode 记录: {linode_id}")
-                    else:
-                        # 更新本地状态
-                        local_linode.ip_address = ip_address
-                        if status == "running":
-                            local_linode.status = LinodeStatus.RUNNING.value
-                            if not local_linode.ready_at:
-                                local_linode.ready_at = datetime.utcnow()
-                    
+                    now = datetime.utcnow()
+                    # 远程存在但本地无记录时创建 (使用配置中的固定 SOCKS5 凭据)
+                    stmt = sqlite_insert(Linode).values(
+                        linode_id=linode_id,
+                        label=self.SWIPE_INSTANCE_LABEL,
+                        region=remote_instance.get("region", "unknown"),
+                        ip_address=ip_address,
+                        status=LinodeStatus.RUNNING if status == "running" else LinodeStatus.PROVISIONING,
+                        socks5_port=self.settings.socks5_port,
+                        socks5_username=self.settings.socks5_username,
+                        socks5_password=self.settings.socks5_password,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                    # 已有记录时更新本地状态
+                    updates = {"ip_address": stmt.excluded.ip_address, "updated_at": now}
+                    if status == "running":
+                        updates["status"] = LinodeStatus.RUNNING
+                        updates["ready_at"] = func.coalesce(Linode.ready_at, now)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[Linode.linode_id],
+                        set_=updates
+                    )
+                    await db.execute(stmt)
                     await db.commit()
+                    logger.info(f"已同步本地 Linode 记录: {linode_id}")
                     
                     # 如果实例正在运行，使用配置中的凭据配置 Aria2 代理
                     if status == "running" and ip_address:
                         await self._configure_aria2_proxy(
                             ip_address, 
-                            settings.socks5_port,
-                            settings.socks5_username,
-                            settings.socks5_password
+                            self.settings.socks5_port,
+                            self.settings.socks5_username,
+                            self.settings.socks5_password
                         )
             else:
                 logger.info("未发现远程 swipe 实例")
                 
                 # 清理本地可能的残留记录
                 async with get_db_context() as db:
-                    stmt = select(Linode).where(
-                        Linode.label == self.SWIPE_INSTANCE_LABEL,
-                        Linode.status != LinodeStatus.DESTROYED.value
+                    # 一条 UPDATE ... RETURNING 标记全部残留记录，无需逐条加载
+                    stmt = (
+                        update(Linode)
+                        .where(
+                            Linode.label == self.SWIPE_INSTANCE_LABEL,
+                            Linode.status != LinodeStatus.DESTROYED
+                        )
+                        .values(
+                            status=LinodeStatus.DESTROYED,
+                            destroyed_at=datetime.utcnow()
+                        )
+                        .returning(Linode.linode_id)
                     )
                     result = await db.execute(stmt)
-                    stale_records = result.scalars().all()
                     
-                    for record in stale_records:
-                        record.status = LinodeStatus.DESTROYED.value
-                        record.destroyed_at = datetime.utcnow()
-                        logger.warning(f"标记过期的本地记录为已销毁: {record.linode_id}")
+                    for linode_id in result.scalars():
+                        logger.warning(f"标记过期的本地记录为已销毁: {linode_id}")
                     
                     await db.commit()
                     
@@ -165,7 +305,7 @@ class Orchestrator:
             logger.error(f"同步实例状态失败: {e}", exc_info=True)
     
     # =========================================================================
-    # 确认转存任务 (每 30s)
+    # 确认转存任务 (事件唤醒，最长每 30s)
     # =========================================================================
     
     async def _confirm_and_provision_loop(self):
@@ -175,32 +315,34 @@ class Orchestrator:
                 await self._process_confirmed_tasks()
             except Exception as e:
                 logger.error(f"确认转存任务异常: {e}", exc_info=True)
-            await asyncio.sleep(30)
+            await self._wait_event(self._new_task_event, 30)
     
     async def _process_confirmed_tasks(self):
         """处理 CONFIRMED 状态的任务"""
+        if self._known_empty(TaskStatus.CONFIRMED):
+            return
+        
+        scanned_at = time.monotonic()
         async with get_db_context() as db:
             # 1. 扫描 CONFIRMED 任务
-            stmt = select(Task).where(Task.status == TaskStatus.CONFIRMED.value)
-            result = await db.execute(stmt)
+            result = await db.execute(self._confirmed_tasks_stmt)
             confirmed_tasks = result.scalars().all()
             
             if not confirmed_tasks:
+                self._mark_empty(TaskStatus.CONFIRMED, scanned_at)
                 return
             
             logger.info(f"发现 {len(confirmed_tasks)} 个待处理任务")
             
             # 2. 检查 swipe 实例是否存在
-            linode_manager = get_linode_manager()
-            instance = await linode_manager.get_instance_by_label(
+            instance = await self.linode_manager.get_instance_by_label(
                 self.SWIPE_INSTANCE_LABEL
             )
             
             if instance is None:
                 # 实例不存在，触发创建
                 if not self._instance_creating:
-                    self._instance_creating = True
-                    asyncio.create_task(self._create_swipe_instance())
+                    self._create_task = self._spawn(self._create_swipe_instance())
                 logger.info("等待 swipe 实例创建完成...")
                 return
             
@@ -211,27 +353,25 @@ class Orchestrator:
             # 3. 确保 Aria2 代理已配置
             await self._ensure_aria2_proxy_configured()
             
-            # 4. 实例已就绪，执行 PikPak 转存
-            pikpak_service = get_pikpak_service()
-            
-            for task in confirmed_tasks:
-                try:
-                    await self._transfer_to_pikpak(db, task, pikpak_service)
-                except Exception as e:
-                    logger.error(f"任务 {task.id} 转存失败: {e}", exc_info=True)
-                    task.status = TaskStatus.ERROR.value
-                    task.error_message = str(e)[:500]
+            # 4. 实例已就绪，并发执行 PikPak 转存
+            await self._run_concurrently(confirmed_tasks, self._transfer_to_pikpak, "转存失败")
             
             await db.commit()
+        
+        if len(confirmed_tasks) >= self.settings.confirm_batch_size:
+            # 本轮取满，可能还有剩余任务，立即进行下一轮
+            self._new_task_event.set()
+        
+        # 分享链接转存通常立即完成，唤醒推送循环
+        self._mark_pending(TaskStatus.PIKPAK_TRANSFERRING)
+        self._transfer_event.set()
     
     async def _create_swipe_instance(self):
         """创建 swipe 实例"""
         logger.info("正在创建 swipe 实例...")
         
         try:
-            linode_manager = get_linode_manager()
-            
-            instance_data = await linode_manager.create_instance(
+            instance_data = await self.linode_manager.create_instance(
                 label=self.SWIPE_INSTANCE_LABEL
             )
             
@@ -251,7 +391,7 @@ class Orchestrator:
                     socks5_username=socks5_username,
                     socks5_password=socks5_password,
                     root_password=instance_data.get("root_pass"),
-                    status=LinodeStatus.PROVISIONING.value
+                    status=LinodeStatus.PROVISIONING
                 )
                 db.add(linode)
                 await db.commit()
@@ -259,59 +399,48 @@ class Orchestrator:
             logger.info(f"Linode 实例 {linode_id} 创建成功，等待就绪...")
             
             # 等待实例运行
-            ip_address = await linode_manager.wait_for_running(
+            ip_address = await self.linode_manager.wait_for_running(
                 linode_id, timeout_seconds=300
             )
             
             if ip_address:
-                async with get_db_context() as db:
-                    stmt = select(Linode).where(Linode.linode_id == linode_id)
-                    result = await db.execute(stmt)
-                    linode = result.scalar_one_or_none()
-                    
-                    if linode:
-                        linode.ip_address = ip_address
-                        linode.status = LinodeStatus.RUNNING.value
-                        linode.ready_at = datetime.utcnow()
-                        await db.commit()
+                await self._update_linode(
+                    linode_id,
+                    ip_address=ip_address,
+                    status=LinodeStatus.RUNNING,
+                    ready_at=datetime.utcnow()
+                )
                 
                 logger.info(f"Linode {linode_id} 已就绪: {ip_address}")
                 
-                # 等待 SOCKS5 服务启动
-                await asyncio.sleep(30)
+                # 等待实例上的 HTTP 代理开始监听 (cloud-init 安装完成)，超时后仍尝试配置
+                if not await wait_for_port(
+                    ip_address, socks5_port + 7000, timeout=self.PROXY_READY_TIMEOUT
+                ):
+                    logger.warning(f"Linode {linode_id} 代理端口在 {self.PROXY_READY_TIMEOUT}s 内未就绪")
                 
                 # 配置 Aria2 代理
                 await self._configure_aria2_proxy(
                     ip_address, socks5_port, socks5_username, socks5_password
                 )
+                
+                # 实例就绪，立即处理等待中的任务
+                self._new_task_event.set()
             else:
                 logger.error(f"Linode {linode_id} 启动超时")
-                async with get_db_context() as db:
-                    stmt = select(Linode).where(Linode.linode_id == linode_id)
-                    result = await db.execute(stmt)
-                    linode = result.scalar_one_or_none()
-                    if linode:
-                        linode.status = LinodeStatus.ZOMBIE.value
-                        await db.commit()
+                await self._update_linode(linode_id, status=LinodeStatus.ZOMBIE)
                         
         except Exception as e:
             logger.error(f"创建 swipe 实例失败: {e}", exc_info=True)
-        finally:
-            self._instance_creating = False
     
-    async def _transfer_to_pikpak(
-        self, 
-        db: AsyncSession, 
-        task: Task, 
-        pikpak_service
-    ):
+    async def _transfer_to_pikpak(self, task: Task):
         """执行 PikPak 转存"""
         source_url = task.source_url
         
-        if pikpak_service.is_magnet_link(source_url):
+        if self.pikpak_service.is_magnet_link(source_url):
             # 磁力链接：离线下载
             logger.info(f"任务 {task.id}: 离线下载磁力链接...")
-            result = await pikpak_service.offline_download(source_url)
+            result = await self.pikpak_service.offline_download(source_url)
             file_id = result.get("task", {}).get("file_id")
             if not file_id:
                 raise Exception("PikPak 离线下载失败: 未返回 file_id")
@@ -320,7 +449,7 @@ class Orchestrator:
             # PikPak 分享链接：执行转存
             logger.info(f"任务 {task.id}: 转存分享链接内容:{source_url}")
             # 返回 [(file_name, original_id), ...]
-            transfer_results = await pikpak_service.transfer_share_content(source_url)
+            transfer_results = await self.pikpak_service.transfer_share_content(source_url)
             if not transfer_results:
                 raise Exception("PikPak 转存分享失败: 未返回 file_id")
             
@@ -330,14 +459,14 @@ class Orchestrator:
             task.pikpak_file_name = file_name  # 用于按名查找实际 ID
         
         # 更新状态
-        task.status = TaskStatus.PIKPAK_TRANSFERRING.value
+        task.status = TaskStatus.PIKPAK_TRANSFERRING
         logger.info(
             f"任务 {task.id} 已进入 PikPak 转存状态, "
             f"file_id={task.pikpak_file_id}, file_name={task.pikpak_file_name}"
         )
     
     # =========================================================================
-    # Aria2 推送任务 (每 30s)
+    # Aria2 推送任务 (事件唤醒，最长每 30s)
     # =========================================================================
     
     async def _push_to_aria2_loop(self):
@@ -347,101 +476,91 @@ class Orchestrator:
                 await self._push_ready_transfers()
             except Exception as e:
                 logger.error(f"Aria2 推送任务异常: {e}", exc_info=True)
-            await asyncio.sleep(30)
+            await self._wait_event(self._transfer_event, 30)
     
     async def _push_ready_transfers(self):
         """检查 PikPak 转存状态并推送到 Aria2"""
+        if self._known_empty(TaskStatus.PIKPAK_TRANSFERRING):
+            return
+        
+        scanned_at = time.monotonic()
         async with get_db_context() as db:
-            stmt = select(Task).where(
-                Task.status == TaskStatus.PIKPAK_TRANSFERRING.value
-            )
-            result = await db.execute(stmt)
+            result = await db.execute(_TRANSFERRING_TASKS_STMT)
             transferring_tasks = result.scalars().all()
             
             if not transferring_tasks:
+                self._mark_empty(TaskStatus.PIKPAK_TRANSFERRING, scanned_at)
                 return
             
             logger.info(f"检查 {len(transferring_tasks)} 个转存中的任务")
             
-            pikpak_service = get_pikpak_service()
-            aria2_client = get_aria2_client()
-            
-            for task in transferring_tasks:
-                try:
-                    if not task.pikpak_file_id:
-                        logger.warning(f"任务 {task.id} 无 pikpak_file_id，跳过")
-                        continue
-                    
-                    # 检查文件是否就绪 (传入文件名用于按名查找)
-                    is_ready, actual_file_id = await pikpak_service.is_file_ready(
-                        task.pikpak_file_id,
-                        task.pikpak_file_name
-                    )
-                    
-                    if not is_ready:
-                        logger.info(f"任务 {task.id} PikPak 文件尚未就绪")
-                        continue
-                    
-                    # 如果通过文件名找到了实际 ID，更新任务
-                    if actual_file_id and actual_file_id != task.pikpak_file_id:
-                        logger.info(
-                            f"任务 {task.id} 更新 pikpak_file_id: "
-                            f"{task.pikpak_file_id} -> {actual_file_id}"
-                        )
-                        task.pikpak_file_id = actual_file_id
-                    
-                    # 获取视频文件直链并推送到 Aria2
-                    await self._push_to_aria2(db, task, pikpak_service, aria2_client)
-                    
-                except Exception as e:
-                    logger.error(f"任务 {task.id} Aria2 推送失败: {e}", exc_info=True)
-                    task.status = TaskStatus.ERROR.value
-                    task.error_message = str(e)[:500]
+            await self._run_concurrently(transferring_tasks, self._push_if_ready, "Aria2 推送失败")
             
             await db.commit()
+        
+        self._mark_pending(TaskStatus.DOWNLOADING)
     
-    async def _push_to_aria2(
-        self,
-        db: AsyncSession,
-        task: Task,
-        pikpak_service,
-        aria2_client
-    ):
+    async def _push_if_ready(self, task: Task):
+        """PikPak 文件就绪后推送到 Aria2"""
+        if not task.pikpak_file_id:
+            logger.warning(f"任务 {task.id} 无 pikpak_file_id，跳过")
+            return
+        
+        # 检查文件是否就绪 (传入文件名用于按名查找)
+        is_ready, actual_file_id = await self.pikpak_service.is_file_ready(
+            task.pikpak_file_id,
+            task.pikpak_file_name
+        )
+        
+        if not is_ready:
+            logger.info(f"任务 {task.id} PikPak 文件尚未就绪")
+            return
+        
+        # 如果通过文件名找到了实际 ID，更新任务
+        if actual_file_id and actual_file_id != task.pikpak_file_id:
+            logger.info(
+                f"任务 {task.id} 更新 pikpak_file_id: "
+                f"{task.pikpak_file_id} -> {actual_file_id}"
+            )
+            task.pikpak_file_id = actual_file_id
+        
+        # 获取视频文件直链并推送到 Aria2
+        await self._push_to_aria2(task)
+    
+    async def _push_to_aria2(self, task: Task):
         """推送任务到 Aria2"""
         logger.info(f"任务 {task.id}: 获取视频文件列表...")
         
         # 递归获取所有视频文件
-        videos = await pikpak_service.get_video_files_recursive(task.pikpak_file_id)
+        videos = await self.pikpak_service.get_video_files_recursive(task.pikpak_file_id)
         
         if not videos:
             logger.warning(f"任务 {task.id}: 未找到视频文件")
-            task.status = TaskStatus.ERROR.value
+            task.status = TaskStatus.ERROR
             task.error_message = "未找到视频文件"
             return
         
         logger.info(f"任务 {task.id}: 发现 {len(videos)} 个视频文件")
         
-        # 推送到 Aria2
-        gids = []
-        for file_id, filename, file_size, download_url in videos:
-            gid = await aria2_client.add_uri(
+        # 所有视频文件合并为一次 multicall 推送到 Aria2
+        gids = await self.aria2_client.multi_add_uri([
+            (
                 [download_url],
-                options={
-                    "dir": self.settings.download_base_path,
-                    "out": filename
-                }
+                {"dir": self.settings.download_base_path, "out": filename}
             )
-            gids.append(gid)
+            for file_id, filename, file_size, download_url in videos
+        ])
+        for (file_id, filename, file_size, download_url), gid in zip(videos, gids):
             logger.info(f"任务 {task.id}: 已推送 {filename} -> GID: {gid}")
         
         # 保存 GID 列表
-        task.set_aria2_gids(gids)
-        task.status = TaskStatus.DOWNLOADING.value
+        task.aria2_gids = gids or None
+        task.status = TaskStatus.DOWNLOADING
         
         logger.info(f"任务 {task.id} 已进入下载状态, {len(gids)} 个文件")
     
     # =========================================================================
-    # 下载监控任务 (每 30s)
+    # 下载监控任务 (Aria2 通知唤醒，兜底每 300s；通知不可用时每 30s)
     # =========================================================================
     
     async def _monitor_downloads_loop(self):
@@ -451,59 +570,113 @@ class Orchestrator:
                 await self._monitor_downloads()
             except Exception as e:
                 logger.error(f"下载监控任务异常: {e}", exc_info=True)
-            await asyncio.sleep(30)
+            interval = (
+                self.MONITOR_SAFETY_INTERVAL if self._notifications_active
+                else self.MONITOR_POLL_INTERVAL
+            )
+            await self._wait_event(self._download_event, interval)
+    
+    async def _aria2_notification_loop(self):
+        """订阅 Aria2 下载事件 (WebSocket)，下载结束时立即唤醒下载监控；断线后退避重连"""
+        delay = 1.0
+        while self._running:
+            try:
+                async with self.aria2_client.notifications() as events:
+                    logger.info("已订阅 Aria2 下载事件通知")
+                    self._notifications_active = True
+                    delay = 1.0
+                    async for method, gid in events:
+                        if method in _DOWNLOAD_FINISHED_EVENTS:
+                            logger.debug("Aria2 通知 %s: %s", method, gid)
+                            self._download_event.set()
+            except Exception as e:
+                logger.warning(f"Aria2 事件通知连接失败: {e}")
+            finally:
+                if self._notifications_active:
+                    self._notifications_active = False
+                    # 断线期间可能错过通知，立即补查一次
+                    self._download_event.set()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.NOTIFY_RECONNECT_MAX)
     
     async def _monitor_downloads(self):
         """监控下载进度并更新状态"""
+        if self._known_empty(TaskStatus.DOWNLOADING):
+            return
+        
+        scanned_at = time.monotonic()
         async with get_db_context() as db:
-            stmt = select(Task).where(Task.status == TaskStatus.DOWNLOADING.value)
-            result = await db.execute(stmt)
-            downloading_tasks = result.scalars().all()
+            # 只读取判断所需的列，状态变更由下方批量 UPDATE 完成，无需加载 ORM 对象
+            result = await db.execute(_DOWNLOADING_TASKS_STMT)
+            downloading_tasks = result.all()
             
             if not downloading_tasks:
+                self._mark_empty(TaskStatus.DOWNLOADING, scanned_at)
+                return
+            
+            # 所有下载中任务的 GID 合并为一次 multicall 查询
+            all_gids = [gid for _, gids in downloading_tasks for gid in (gids or [])]
+            try:
+                statuses = await self.aria2_client.multi_tell_status(all_gids, ["status"])
+            except Exception as e:
+                logger.warning(f"批量查询 Aria2 状态失败: {e}")
                 return
+            status_by_gid = dict(zip(all_gids, statuses))
             
-            aria2_client = get_aria2_client()
+            # 按目标状态收集任务 ID，循环结束后每组一条 UPDATE
+            completed_ids: List[int] = []
+            errored_ids: Dict[str, List[int]] = {}  # 错误信息 -> 任务 ID
             
-            for task in downloading_tasks:
+            for task_id, gids in downloading_tasks:
                 try:
-                    gids = task.get_aria2_gids()
                     if not gids:
-                        logger.warning(f"任务 {task.id} 无 aria2_gids，标记为错误")
-                        task.status = TaskStatus.ERROR.value
-                        task.error_message = "无下载任务 GID"
+                        logger.warning(f"任务 {task_id} 无 aria2_gids，标记为错误")
+                        errored_ids.setdefault("无下载任务 GID", []).append(task_id)
                         continue
                     
                     all_complete = True
                     has_error = False
                     
                     for gid in gids:
-                        try:
-                            status = await aria2_client.tell_status(gid, ["status"])
-                            aria2_status = status.get("status")
-                            
-                            if aria2_status == "error":
-                                has_error = True
-                                break
-                            elif aria2_status != "complete":
-                                all_complete = False
-                        except Exception as e:
-                            # GID 可能不存在，视为完成或忽略
-                            logger.warning(f"查询 GID {gid} 状态失败: {e}")
-                            # 保守处理，认为还在进行中
+                        status = status_by_gid.get(gid)
+                        if status is None:
+                            # GID 可能不存在，保守处理，认为还在进行中
+                            logger.warning(f"查询 GID {gid} 状态失败")
+                            all_complete = False
+                            continue
+                        
+                        aria2_status = status.get("status")
+                        if aria2_status == "error":
+                            has_error = True
+                            break
+                        elif aria2_status != "complete":
                             all_complete = False
                     
                     if has_error:
-                        task.status = TaskStatus.ERROR.value
-                        task.error_message = "Aria2 下载失败"
-                        logger.warning(f"任务 {task.id} 下载失败")
+                        errored_ids.setdefault("Aria2 下载失败", []).append(task_id)
+                        logger.warning(f"任务 {task_id} 下载失败")
                     elif all_complete:
-                        task.status = TaskStatus.COMPLETE.value
-                        task.completed_at = datetime.utcnow()
-                        logger.info(f"任务 {task.id} 下载完成")
+                        completed_ids.append(task_id)
+                        logger.info(f"任务 {task_id} 下载完成")
                         
                 except Exception as e:
-                    logger.warning(f"监控任务 {task.id} 状态失败: {e}")
+                    logger.warning(f"监控任务 {task_id} 状态失败: {e}")
+            
+            if completed_ids:
+                await db.execute(
+                    update(Task)
+                    .where(Task.id.in_(completed_ids))
+                    .values(
+                        status=TaskStatus.COMPLETE,
+                        completed_at=datetime.utcnow()
+                    )
+                )
+            for error_message, ids in errored_ids.items():
+                await db.execute(
+                    update(Task)
+                    .where(Task.id.in_(ids))
+                    .values(status=TaskStatus.ERROR, error_message=error_message)
+                )
             
             await db.commit()
     
@@ -522,97 +695,61 @@ class Orchestrator:
     
     async def _check_and_cleanup(self):
         """检查是否需要销毁实例"""
+        # 本轮所需的数据库读取在同一会话内完成，调用 Linode API 前释放连接
+        local_linode = None
         async with get_db_context() as db:
-            # 检查是否有活跃任务
-            active_statuses = [
-                TaskStatus.CONFIRMED.value,
-                TaskStatus.PIKPAK_TRANSFERRING.value,
-                TaskStatus.DOWNLOADING.value
-            ]
-            
-            stmt = select(func.count()).select_from(Task).where(
-                Task.status.in_(active_statuses)
-            )
-            result = await db.execute(stmt)
-            active_count = result.scalar()
+            # 活跃任务数与最后完成时间合并为一次查询
+            result = await db.execute(_CLEANUP_STATS_STMT)
+            active_count, last_completed = result.one()
             
             if active_count > 0:
                 return
             
-            # 获取最后完成任务的时间
-            stmt = select(Task.completed_at).where(
-                Task.status == TaskStatus.COMPLETE.value,
-                Task.completed_at.isnot(None)
-            ).order_by(Task.completed_at.desc()).limit(1)
-            result = await db.execute(stmt)
-            last_completed = result.scalar()
-            
             if last_completed is None:
-                # 没有完成的任务，检查是否有未销毁的实例 (可能是遗留的)
-                await self._cleanup_stale_instance()
-                return
-            
-            # 检查是否已空闲超过 5 分钟
-            idle_threshold = datetime.utcnow() - timedelta(minutes=5)
-            if last_completed > idle_threshold:
-                return
-            
-            # 执行销毁
-            logger.info("系统空闲超过 5 分钟，准备销毁 swipe 实例...")
-            await self._destroy_swipe_instance()
+                # 没有完成的任务，查找本地未销毁的实例记录 (可能是遗留的)
+                result = await db.execute(_LIVE_SWIPE_LINODE_STMT)
+                local_linode = result.one_or_none()
+        
+        if last_completed is None:
+            await self._cleanup_stale_instance(local_linode)
+            return
+        
+        # 检查是否已空闲超过 5 分钟
+        idle_threshold = datetime.utcnow() - timedelta(minutes=5)
+        if last_completed > idle_threshold:
+            return
+        
+        # 执行销毁
+        logger.info("系统空闲超过 5 分钟，准备销毁 swipe 实例...")
+        await self._destroy_swipe_instance()
     
-    async def _cleanup_stale_instance(self):
-        """清理可能遗留的实例"""
-        linode_manager = get_linode_manager()
+    async def _cleanup_stale_instance(self, local_linode):
+        """
+        清理可能遗留的实例 (调用方已确认当前没有活跃任务)
+        
+        Args:
+            local_linode: 本地未销毁的实例记录 (linode_id, created_at)，没有时为 None
+        """
+        # 检查实例创建时间，如果超过 30 分钟且无任务，则销毁
+        if local_linode is None or local_linode.created_at is None:
+            return
+        if datetime.utcnow() - local_linode.created_at <= timedelta(minutes=30):
+            return
         
-        instance = await linode_manager.get_instance_by_label(
+        instance = await self.linode_manager.get_instance_by_label(
             self.SWIPE_INSTANCE_LABEL
         )
-        
         if instance is None:
             return
         
-        # 检查本地数据库中是否有活跃任务记录
-        async with get_db_context() as db:
-            stmt = select(Linode).where(
-                Linode.label == self.SWIPE_INSTANCE_LABEL,
-                Linode.status.in_([
-                    LinodeStatus.PROVISIONING.value,
-                    LinodeStatus.RUNNING.value
-                ])
-            )
-            result = await db.execute(stmt)
-            local_linode = result.scalar_one_or_none()
-            
-            if local_linode:
-                # 先检查是否有活跃任务，有的话不销毁
-                active_statuses = [
-                    TaskStatus.CONFIRMED.value,
-                    TaskStatus.PIKPAK_TRANSFERRING.value,
-                    TaskStatus.DOWNLOADING.value
-                ]
-                stmt = select(func.count()).select_from(Task).where(
-                    Task.status.in_(active_statuses)
-                )
-                result = await db.execute(stmt)
-                if result.scalar() > 0:
-                    # 有活跃任务，不销毁
-                    return
-                
-                # 检查实例创建时间，如果超过 30 分钟且无任务，则销毁
-                if local_linode.created_at:
-                    age = datetime.utcnow() - local_linode.created_at
-                    if age > timedelta(minutes=30):
-                        logger.warning(
-                            f"发现空闲超过 30 分钟的实例: {local_linode.linode_id}，执行销毁"
-                        )
-                        await self._destroy_swipe_instance()
+        logger.warning(
+            f"发现空闲超过 30 分钟的实例: {local_linode.linode_id}，执行销毁"
+        )
+        await self._destroy_swipe_instance()
     
     async def _destroy_swipe_instance(self):
         """销毁 swipe 实例"""
-        linode_manager = get_linode_manager()
-        
-        instance = await linode_manager.get_instance_by_label(
+        instance = await self.linode_manager.get_instance_by_label(
             self.SWIPE_INSTANCE_LABEL
         )
         
@@ -624,45 +761,58 @@ class Orchestrator:
         
         try:
             # 更新本地状态
-            async with get_db_context() as db:
-                stmt = select(Linode).where(Linode.linode_id == linode_id)
-                result = await db.execute(stmt)
-                linode = result.scalar_one_or_none()
-                
-                if linode:
-                    linode.status = LinodeStatus.DESTROYING.value
-                    await db.commit()
+            await self._update_linode(linode_id, status=LinodeStatus.DESTROYING)
             
             # 调用 API 删除
-            success = await linode_manager.delete_instance(linode_id)
+            success = await self.linode_manager.delete_instance(linode_id)
             
             async with get_db_context() as db:
-                stmt = select(Linode).where(Linode.linode_id == linode_id)
-                result = await db.execute(stmt)
-                linode = result.scalar_one_or_none()
-                
-                if linode:
-                    if success:
-                        linode.status = LinodeStatus.DESTROYED.value
-                        linode.destroyed_at = datetime.utcnow()
-                        
-                        if linode.ready_at:
-                            minutes = int(
-                                (datetime.utcnow() - linode.ready_at).total_seconds() / 60
+                if success:
+                    # 运行时长在 SQL 中计算，一条 UPDATE ... RETURNING 完成写入并取回计费所需字段
+                    now = datetime.utcnow()
+                    elapsed_minutes = cast(
+                        (func.julianday(now) - func.julianday(Linode.ready_at)) * 1440,
+                        Integer
+                    )
+                    stmt = (
+                        update(Linode)
+                        .where(Linode.linode_id == linode_id)
+                        .values(
+                            status=LinodeStatus.DESTROYED,
+                            destroyed_at=now,
+                            total_minutes=case(
+                                (Linode.ready_at.isnot(None), elapsed_minutes),
+                                else_=Linode.total_minutes
                             )
-                            linode.total_minutes = minutes
-                        
-                        logger.info(f"Linode {linode_id} 已销毁")
-                    else:
-                        linode.status = LinodeStatus.ZOMBIE.value
-                        logger.error(f"Linode {linode_id} 销毁失败")
+                        )
+                        .returning(
+                            Linode.created_at,
+                            Linode.ready_at,
+                            Linode.total_minutes,
+                            Linode.hourly_cost
+                        )
+                    )
+                    linode = (await db.execute(stmt)).one_or_none()
                     
-                    await db.commit()
+                    if linode and linode.ready_at:
+                        await add_monthly_cost(
+                            db, linode.created_at, linode.total_minutes * linode.hourly_cost / 60
+                        )
+                    
+                    logger.info(f"Linode {linode_id} 已销毁")
+                else:
+                    await db.execute(
+                        update(Linode)
+                        .where(Linode.linode_id == linode_id)
+                        .values(status=LinodeStatus.ZOMBIE)
+                    )
+                    logger.error(f"Linode {linode_id} 销毁失败")
+                
+                await db.commit()
             
             # 清除 Aria2 代理
-            aria2_client = get_aria2_client()
             try:
-                await aria2_client.set_proxy(None)
+                await self.aria2_client.set_proxy(None)
                 logger.info("Aria2 代理已清除")
             except Exception as e:
                 logger.warning(f"清除代理失败: {e}")
@@ -674,6 +824,41 @@ class Orchestrator:
     # 辅助方法
     # =========================================================================
     
+    async def _update_linode(self, linode_id: int, **values):
+        """按 Linode ID 直接更新本地记录 (单条 UPDATE，无需先查询)"""
+        async with get_db_context() as db:
+            await db.execute(
+                update(Linode).where(Linode.linode_id == linode_id).values(**values)
+            )
+            await db.commit()
+    
+    async def _run_concurrently(
+        self,
+        tasks: List[Task],
+        worker: Callable[[Task], Awaitable[None]],
+        error_label: str
+    ):
+        """
+        并发处理任务 (同时最多 pikpak_concurrency 个)，单个任务失败时标记为 ERROR
+        
+        worker 只修改任务属性，不在共享会话上执行查询，因此可以安全并发。
+        """
+        semaphore = asyncio.Semaphore(self.settings.pikpak_concurrency)
+        
+        async def run(task: Task):
+            async with semaphore:
+                await worker(task)
+        
+        results = await asyncio.gather(
+            *(run(task) for task in tasks),
+            return_exceptions=True
+        )
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception):
+                logger.error(f"任务 {task.id} {error_label}: {result}", exc_info=result)
+                task.status = TaskStatus.ERROR
+                task.error_message = str(result)[:500]
+    
     async def _configure_aria2_proxy(
         self, 
         ip_address: str, 
@@ -690,8 +875,6 @@ class Orchestrator:
             username: 认证用户名
             password: 认证密码
         """
-        from urllib.parse import quote
-        
         # HTTP 代理端口 = SOCKS5 端口 + 7000
         http_port = port + 7000
         
@@ -702,8 +885,7 @@ class Orchestrator:
         proxy_url = f"http://{username}:{encoded_password}@{ip_address}:{http_port}"
         
         try:
-            aria2_client = get_aria2_client()
-            await aria2_client.set_proxy(proxy_url)
+            await self.aria2_client.set_proxy(proxy_url)
             logger.info(f"Aria2 HTTP 代理已配置: http://{username}:***@{ip_address}:{http_port}")
         except Exception as e:
             logger.error(f"配置 Aria2 代理失败: {e}")
@@ -711,20 +893,17 @@ class Orchestrator:
     async def _ensure_aria2_proxy_configured(self):
         """确保 Aria2 代理已配置"""
         async with get_db_context() as db:
-            stmt = select(Linode).where(
-                Linode.label == self.SWIPE_INSTANCE_LABEL,
-                Linode.status == LinodeStatus.RUNNING.value
+            result = await db.execute(_RUNNING_PROXY_STMT)
+            linode = result.one_or_none()
+        
+        # 会话已释放，配置代理的 RPC 期间不占用数据库连接
+        if linode and linode.ip_address and linode.socks5_password:
+            await self._configure_aria2_proxy(
+                linode.ip_address,
+                linode.socks5_port,
+                linode.socks5_username,
+                linode.socks5_password
             )
-            result = await db.execute(stmt)
-            linode = result.scalar_one_or_none()
-            
-            if linode and linode.ip_address and linode.socks5_password:
-                await self._configure_aria2_proxy(
-                    linode.ip_address,
-                    linode.socks5_port,
-                    linode.socks5_username,
-                    linode.socks5_password
-                )
     
     # =========================================================================
     # 公共 API
@@ -734,50 +913,48 @@ class Orchestrator:
         """紧急销毁所有实例"""
         logger.warning("执行紧急销毁！")
         
-        linode_manager = get_linode_manager()
-        
-        # 销毁所有 swipe 相关实例
-        deleted_count = await linode_manager.delete_all_instances("swipe")
+        # API 删除与清除代理互不依赖，并发执行
+        deleted_count, _ = await asyncio.gather(
+            self.linode_manager.delete_all_instances("swipe"),
+            self._clear_aria2_proxy()
+        )
+        # 远程删除完成后才标记本地记录 (列表拉取失败时直接抛出，保留本地状态)
+        await self._mark_all_linodes_destroyed()
         
-        # 更新数据库记录
+        logger.warning(f"已销毁 {deleted_count} 个实例")
+        return deleted_count
+    
+    async def _mark_all_linodes_destroyed(self):
+        """将所有未销毁的本地实例记录标记为已销毁"""
         async with get_db_context() as db:
-            stmt = (
+            await db.execute(
                 update(Linode)
-                .where(Linode.status != LinodeStatus.DESTROYED.value)
+                .where(Linode.status != LinodeStatus.DESTROYED)
                 .values(
-                    status=LinodeStatus.DESTROYED.value,
+                    status=LinodeStatus.DESTROYED,
                     destroyed_at=datetime.utcnow()
                 )
             )
-            await db.execute(stmt)
-            
-            # 清除代理
-            aria2_client = get_aria2_client()
-            try:
-                await aria2_client.set_proxy(None)
-            except:
-                pass
-            
             await db.commit()
-        
-        logger.warning(f"已销毁 {deleted_count} 个实例")
-        return deleted_count
+    
+    async def _clear_aria2_proxy(self):
+        """清除 Aria2 代理 (失败时忽略)"""
+        try:
+            await self.aria2_client.set_proxy(None)
+        except Exception:
+            pass
     
     async def get_status(self) -> Dict[str, Any]:
         """获取编排引擎状态"""
         async with get_db_context() as db:
-            # 统计各状态任务数
-            status_counts = {}
-            for status in TaskStatus:
-                stmt = select(func.count()).select_from(Task).where(
-                    Task.status == status.value
-                )
-                result = await db.execute(stmt)
-                status_counts[status.value] = result.scalar()
+            # 统计各状态任务数 (一次 GROUP BY 查询)
+            status_counts = dict.fromkeys(_TASK_STATUS_VALUES, 0)
+            result = await db.execute(_TASK_STATUS_COUNTS_STMT)
+            for status, count in result.all():
+                status_counts[status.value] = count
             
             # 获取当前实例信息
-            linode_manager = get_linode_manager()
-            instance = await linode_manager.get_instance_by_label(
+            instance = await self.linode_manager.get_instance_by_label(
                 self.SWIPE_INSTANCE_LABEL
             )
             
@@ -1,6 +1,7 @@
 """
 PikPak API 服务
 """
+import asyncio
 import logging
 import re
 from typing import Any, Dict, List, Optional, Tuple
@@ -30,15 +31,22 @@ class PikPakService:
         self.username = username or settings.pikpak_username
         self.password = password or settings.pikpak_password
         self._client: Optional[PikPakApi] = None
+        # 并发调用时只登录一次
+        self._login_lock = asyncio.Lock()
     
     async def _ensure_client(self) -> PikPakApi:
         """确保客户端已登录"""
-        if self._client is None:
-            self._client = PikPakApi(
-                username=self.username,
-                password=self.password
-            )
-            await self._client.login()
+        if self._client is not None:
+            return self._client
+        async with self._login_lock:
+            if self._client is None:
+                client = PikPakApi(
+                    username=self.username,
+                    password=self.password
+                )
+                await client.login()
+                # 登录成功后再发布，其他协程不会拿到未登录的客户端
+                self._client = client
         return self._client
     
     async def login(self) -> bool:
@@ -94,7 +102,7 @@ class PikPakService:
             
             logger.info(f"根目录文件数量: {len(root_files)}")
             for f in root_files:
-                logger.debug(f"根目录文件: id={f.get('id')}, name={f.get('name')}, kind={f.get('kind')}")
+                logger.debug("根目录文件: id=%s, name=%s, kind=%s", f.get('id'), f.get('name'), f.get('kind'))
             
             pack_folder_id = None
             for f in root_files:
@@ -6,13 +6,62 @@ import json
 import logging
 import os
 import tempfile
-from typing import Optional
+from typing import Callable, Optional
 
 import httpx
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# 端口探测的退避间隔 (秒): 0.5 -> 1 -> 2 -> 4 -> 5 (封顶)
+_PORT_POLL_INITIAL = 0.5
+_PORT_POLL_MAX = 5.0
+# 单次连接尝试的超时 (秒): 防火墙丢弃 SYN 时不必等满系统默认的连接超时
+_PORT_CONNECT_TIMEOUT = 2.0
+
+
+async def wait_for_port(
+    host: str,
+    port: int,
+    timeout: float,
+    alive: Optional[Callable[[], bool]] = None
+) -> bool:
+    """
+    轮询等待 TCP 端口可连接 (指数退避)，代替固定时长的 sleep
+    
+    Args:
+        host: 目标地址
+        port: 目标端口
+        timeout: 最长等待秒数
+        alive: 可选的存活检查，返回 False 时立即放弃 (如监听进程已退出)
+        
+    Returns:
+        端口在超时前可连接时返回 True
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = _PORT_POLL_INITIAL
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0 or (alive is not None and not alive()):
+            return False
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port),
+                timeout=min(remaining, _PORT_CONNECT_TIMEOUT)
+            )
+        except (OSError, asyncio.TimeoutError):
+            await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+            delay = min(delay * 2, _PORT_POLL_MAX)
+            continue
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+
 class ProxyTester:
     """代理连通性测试器"""
     
@@ -69,8 +118,11 @@ class ProxyTester:
             
             logger.info(f"Hysteria 客户端已启动 (PID: {process.pid})，等待握手...")
             
-            # 等待客户端建立连接 (延长至 10 秒)
-            await asyncio.sleep(10)
+            # 等待客户端完成握手并开始监听本地 SOCKS5 端口 (最长 10 秒)
+            await wait_for_port(
+                "127.0.0.1", socks5_port, timeout=10,
+                alive=lambda: process.returncode is None
+            )
             
             # 检查进程是否还在运行
             if process.returncode is not None:
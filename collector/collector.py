@@ -91,6 +91,9 @@ class TelegramCollector:
     # 时间窗口 (秒)
     ASSOCIATION_WINDOW = 30
     
+    # 单次批量提交的最大资源数 (与后端 TaskBulkCreate 上限一致)
+    SUBMIT_BATCH_SIZE = 500
+    
     def __init__(
         self,
         api_id: int,
@@ -205,8 +208,8 @@ class TelegramCollector:
                 to_submit.append(resource)
                 del self._pending_resources[key]
         
-        for resource in to_submit:
-            await self._submit_resource(resource)
+        if to_submit:
+            await self._submit_resources(to_submit)
         
         # 清理过期的媒体缓存
         for chat_id in list(self._recent_media.keys()):
@@ -367,29 +370,55 @@ class TelegramCollector:
                     if media.text and not resource.description:
                         resource.description = media.text
     
-    async def _submit_resource(self, resource: PendingResource):
-        """提交资源到后端"""
-        try:
-            payload = {
-                "telegram_chat_id": resource.chat_id,
-                "telegram_msg_id": resource.msg_id,
-                "source_url": resource.source_url,
-                "title": resource.title,
-                "description": resource.description,
-                "preview_image": resource.preview_images[0] if resource.preview_images else None,
-                "preview_images": resource.preview_images
-            }
-            
-            response = await self._http_client.post(
-                "/api/tasks/internal/create",
-                json=payload
+    async def _submit_resources(self, resources: List[PendingResource]):
+        """批量提交资源到后端 (每 SUBMIT_BATCH_SIZE 个一次请求、一次事务)"""
+        for start in range(0, len(resources), self.SUBMIT_BATCH_SIZE):
+            chunk = resources[start:start + self.SUBMIT_BATCH_SIZE]
+            try:
+                await self._submit_chunk(chunk)
+            except Exception as e:
+                logger.error(f"创建任务失败: {e}")
+    
+    async def _submit_chunk(self, chunk: List[PendingResource]):
+        """
+        提交一批资源；后端以 4xx 拒绝整批时 (如某条数据校验失败) 二分重试，
+        只丢弃无效的那一条，其余资源照常入库 (批量接口对重复任务幂等)
+        """
+        payload = {
+            "tasks": [
+                {
+                    "telegram_chat_id": resource.chat_id,
+                    "telegram_msg_id": resource.msg_id,
+                    "source_url": resource.source_url,
+                    "title": resource.title,
+                    "description": resource.description,
+                    "preview_image": resource.preview_images[0] if resource.preview_images else None,
+                    "preview_images": resource.preview_images
+                }
+                for resource in chunk
+            ]
+        }
+        
+        response = await self._http_client.post(
+            "/api/tasks/internal/create-batch",
+            json=payload
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            logger.info(f"批量创建任务: 新增 {result['created']} 个, 跳过 {result['skipped']} 个")
+        elif 400 <= response.status_code < 500 and len(chunk) > 1:
+            logger.warning(f"批量创建任务被拒绝: HTTP {response.status_code}，拆分 {len(chunk)} 个资源重试")
+            middle = len(chunk) // 2
+            await self._submit_chunk(chunk[:middle])
+            await self._submit_chunk(chunk[middle:])
+        elif 400 <= response.status_code < 500:
+            logger.error(
+                f"创建任务失败: HTTP {response.status_code}, 已丢弃资源 "
+                f"chat_id={chunk[0].chat_id}, msg_id={chunk[0].msg_id}: {response.text[:200]}"
             )
-            
-            if response.status_code == 200:
-                logger.info(f"任务创建成功: {resource.title[:30]}... (预览图: {len(resource.preview_images)}张)")
-                
-        except Exception as e:
-            logger.error(f"创建任务失败: {e}")
+        else:
+            logger.error(f"批量创建任务失败: HTTP {response.status_code}")
     
     def _extract_urls(self, text: str) -> List[str]:
         """从文本中提取资源链接"""
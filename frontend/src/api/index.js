@@ -23,9 +23,11 @@ export default {
     tasks: {
         /**
          * 获取待筛选任务列表
+         * @param cursor 上一页返回的 next_cursor (首页传 null)
+         * @param includeTotal 是否返回总数 (仅首页需要)
          */
-        getPending(limit = 20, offset = 0) {
-            return api.get('/tasks/pending', { params: { limit, offset } })
+        getPending(limit = 20, cursor = null, includeTotal = false) {
+            return api.get('/tasks/pending', { params: { limit, cursor, include_total: includeTotal } })
         },
 
         /**
@@ -58,9 +60,11 @@ export default {
 
         /**
          * 获取任务列表 (按状态过滤)
+         * @param cursor 上一页返回的 next_cursor (首页传 null)
+         * @param includeTotal 是否返回总数 (仅首页需要)
          */
-        list(status, limit = 20, offset = 0) {
-            return api.get('/tasks', { params: { status, limit, offset } })
+        list(status, limit = 20, cursor = null, includeTotal = false) {
+            return api.get('/tasks', { params: { status, limit, cursor, include_total: includeTotal } })
         }
     },
 
@@ -7,26 +7,33 @@ export const useTaskStore = defineStore('tasks', () => {
     const pending = ref([])
     const loading = ref(false)
     const total = ref(0)
+    const totalCapped = ref(false)
+    const nextCursor = ref(null)
 
     // 计算属性
-    const hasMore = computed(() => pending.value.length < total.value)
+    const hasMore = computed(() => nextCursor.value !== null)
     const isEmpty = computed(() => !loading.value && pending.value.length === 0)
 
     // 加载待筛选任务
     async function loadPending(refresh = false) {
         if (loading.value) return
+        // 已到最后一页
+        if (!refresh && !hasMore.value) return
 
         loading.value = true
         try {
-            const offset = refresh ? 0 : pending.value.length
-            const result = await api.tasks.getPending(20, offset)
+            const cursor = refresh ? null : nextCursor.value
+            // 总数只在刷新时查询，翻页沿用已有值
+            const result = await api.tasks.getPending(20, cursor, refresh)
 
             if (refresh) {
                 pending.value = result.tasks
+                total.value = result.total
+                totalCapped.value = result.total_capped
             } else {
                 pending.value.push(...result.tasks)
             }
-            total.value = result.total
+            nextCursor.value = result.next_cursor
         } catch (error) {
             console.error('加载任务失败:', error)
             throw error
@@ -72,6 +79,7 @@ export const useTaskStore = defineStore('tasks', () => {
         pending,
         loading,
         total,
+        totalCapped,
         hasMore,
         isEmpty,
         currentTask,